@@ -1,7 +1,7 @@
 import streamlit as st
-from PIL import Image
-import os
-import base64
+
+from core.branding import show_logo
+from core.perf import begin_run, end_run
 
 # Set page config
 st.set_page_config(
@@ -10,18 +10,11 @@ st.set_page_config(
     layout="wide"
 )
 
+# Per-stage timings of this rerun (EMISSION_TRACKER_PERF=log or panel)
+begin_run("Home")
+
 # Load Emission Tracker logo
-logo_path = "data/logoE.png"
-if os.path.exists(logo_path):
-    st.markdown(
-        f"""
-        <div style="text-align: center;">
-            <img src="data:image/png;base64,{base64.b64encode(open(logo_path, "rb").read()).decode()}" alt="logo" width="400">
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-    
+show_logo()
 
 # Title and Text
 st.title("Welcome to the Emission Tracker Dashboard")
@@ -50,4 +43,6 @@ st.write("""
 Built with 🚀 using Streamlit.
 
 Maintained by [@TEAM13](https://github.com/pinosjpp/Emission_Tracker)
-""")
\ No newline at end of file
+""")
+
+end_run()
@@ -0,0 +1 @@
+# Shared helpers used by Home.py and the pages/ scripts
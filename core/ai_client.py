@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+
+from core.llm import BackendUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncChatClient:
+    """Async OpenAI client shared by every session of the server process.
+
+    Requests run on one background event loop. At most ``max_concurrency``
+    are in flight; the rest wait their turn (up to ``queue_timeout`` s)
+    instead of failing. Rate-limit and timeout errors are retried with
+    exponential backoff and full jitter as long as nothing has been
+    streamed yet, and every request is bounded by ``request_timeout``.
+    """
+
+    def __init__(self, api_key, base_url=None, max_concurrency=8, max_retries=4,
+                 request_timeout=60.0, queue_timeout=120.0, backoff_base=0.5, backoff_cap=20.0):
+        import openai
+
+        self._openai = openai
+        self._client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=request_timeout)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.queue_timeout = queue_timeout
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # Counters are only written on the loop thread
+        self.in_flight = 0
+        self.queued = 0
+        self.retries = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="ai-client", daemon=True).start()
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "queued": self.queued, "retries": self.retries, "max_concurrency": self.max_concurrency}
+
+    def backoff(self, attempt, error=None):
+        """Seconds to wait before retry ``attempt`` (0-based), honouring Retry-After."""
+        retry_after = getattr(getattr(error, "response", None), "headers", {}).get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_cap)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def stream(self, model, messages):
+        """Blocking generator of text chunks; closing it cancels the request."""
+        out = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._run(model, messages, out), self._loop)
+        try:
+            while True:
+                kind, value = out.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    async def _run(self, model, messages, out):
+        try:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            finally:
+                self.queued -= 1
+            self.in_flight += 1
+            try:
+                await self._stream_with_retries(model, messages, out)
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+            out.put(("done", None))
+        except asyncio.TimeoutError:
+            out.put(("error", BackendUnavailable("timed out waiting for a free request slot")))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            out.put(("error", e))
+
+    async def _stream_with_retries(self, model, messages, out):
+        openai = self._openai
+        for attempt in range(self.max_retries + 1):
+            streamed = False
+            try:
+                response = await self._client.chat.completions.create(model=model, messages=messages, stream=True)
+                try:
+                    async for chunk in response:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            streamed = True
+                            out.put(("chunk", chunk.choices[0].delta.content))
+                finally:
+                    await response.close()
+                return
+            except (openai.RateLimitError, openai.APITimeoutError) as e:
+                # A retry after partial output would repeat text, so only retry clean failures
+                if streamed or attempt == self.max_retries:
+                    raise BackendUnavailable(str(e)) from e
+                delay = self.backoff(attempt, e)
+                self.retries += 1
+                logger.info("chat request %s, retrying in %.2fs (attempt %d)", type(e).__name__, delay, attempt + 1)
+                await asyncio.sleep(delay)
+            except openai.APIError as e:
+                raise BackendUnavailable(str(e)) from e
@@ -0,0 +1,101 @@
+"""Small HTTP/JSON endpoint over core.query for reporting jobs.
+
+    python -m core.api --port 8600
+    curl 'http://127.0.0.1:8600/v1/registrations/map?year=2020&vehicle_type=Auto&exclude_california=1'
+
+GET /v1/<query> with filters as query parameters; repeat a parameter for
+several values (``state=CA&state=TX``). Results are columnar JSON, see
+core.query.to_columns. GET /v1/ lists the queries.
+"""
+import argparse
+import inspect
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from core.query import QUERIES, to_columns
+
+logger = logging.getLogger(__name__)
+
+# Query-string names of the list filters, mapped to the query arguments
+LIST_PARAMS = {
+    "vehicle_type": "vehicle_types", "class": "classes", "metric": "metrics",
+    "manufacturer": "manufacturers", "state": "states", "entity": "entities", "event_year": "event_years",
+}
+INT_PARAMS = {"year", "start_year", "end_year", "window"}
+BOOL_PARAMS = {"exclude_california"}
+
+
+def parse_params(query, function):
+    """Keyword arguments for ``function`` from a parsed query string."""
+    accepted = inspect.signature(function).parameters
+    kwargs = {}
+    for name, values in query.items():
+        target = LIST_PARAMS.get(name, name)
+        if target not in accepted:
+            raise ValueError(f"unknown parameter: {name}")
+        if name in LIST_PARAMS:
+            kwargs[target] = [v for value in values for v in value.split(",") if v]
+        elif name in INT_PARAMS:
+            kwargs[target] = int(values[-1])
+        elif name in BOOL_PARAMS:
+            kwargs[target] = values[-1].lower() in ("1", "true", "yes")
+        else:
+            kwargs[target] = values[-1]
+    return kwargs
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = url.path.strip("/").removeprefix("v1").strip("/")
+        if not name:
+            self._send(200, {"queries": {n: inspect.getdoc(f).splitlines()[0] for n, f in QUERIES.items()}})
+            return
+        function = QUERIES.get(name)
+        if function is None:
+            self._send(404, {"error": f"unknown query: {name}"})
+            return
+        try:
+            result = function(**parse_params(parse_qs(url.query), function))
+        except (TypeError, ValueError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # A missing data file or a bug: log it and answer instead of dropping the connection
+            logger.exception("query %s failed", name)
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, to_columns(result))
+
+
+def serve(port=8600, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+    server = serve(args.port, args.host)
+    print(f"emissions query API on http://{args.host}:{args.port}/v1/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
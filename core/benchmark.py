@@ -0,0 +1,307 @@
+"""Latency of the pages and their data path on scaled synthetic datasets.
+
+    python -m core.benchmark [--scales 1 10 100] [--repeat 3] [--json results.json]
+
+For every scale the source CSVs are replicated that many times (with a few
+percent of noise on the measurements) into a temporary data directory, and a
+fresh interpreter pointed at it through EMISSION_TRACKER_DATA_DIR measures:
+
+* data path: the load, aggregation and figure stages each page goes through,
+  called directly on the core helpers;
+* page: the whole script run headlessly with streamlit's AppTest.
+
+Both are timed on a cold start (empty process caches and data/cache), a
+restart (empty process caches, typed cache on disk) and after each common
+interaction. Figures are medians over ``--repeat`` runs in milliseconds.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.data import DATA_DIR, MANUFACTURER_DATA_PATH, REGISTRATION_DATA_PATH, VEHICLE_DATA_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = [VEHICLE_DATA_PATH, MANUFACTURER_DATA_PATH, REGISTRATION_DATA_PATH]
+# Identifier columns copied unchanged into every replica
+KEY_COLUMNS = {"Model Year", "Regulatory Class", "Vehicle Type", "Manufacturer", "year", "state"}
+NOISE = 0.05
+DEFAULT_SCALES = [1, 10, 100]
+STAGES = ["load", "aggregate", "figure", "page"]
+
+
+def _noisy(df, rng):
+    df = df.copy()
+    for column in df.columns.difference(list(KEY_COLUMNS)):
+        values = pd.to_numeric(df[column], errors="coerce")
+        whole = values.dropna().eq(values.dropna().round()).all()
+        noisy = (values * rng.uniform(1 - NOISE, 1 + NOISE, len(df))).round(0 if whole else 5)
+        noisy = noisy.astype("Int64") if whole else noisy
+        # Placeholders such as "-" stay as they are
+        df[column] = noisy.astype(str).where(values.notna(), df[column])
+    return df
+
+
+def write_scaled_data(out_dir, scale, seed=0):
+    """Write every source CSV replicated ``scale`` times into ``out_dir``."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    for path in SOURCES:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        scaled = pd.concat([df] + [_noisy(df, rng) for _ in range(scale - 1)], ignore_index=True)
+        scaled.to_csv(os.path.join(out_dir, os.path.basename(path)), index=False)
+
+
+def reset_caches(disk=True):
+    """Empty every in-process cache of core (and the typed cache on disk with ``disk``)."""
+    from core.data import CACHE_DIR
+    from core.figcache import figure_cache
+
+    for name, module in list(sys.modules.items()):
+        if name.startswith("core.") and module is not None:
+            for value in vars(module).values():
+                if callable(getattr(value, "cache_clear", None)):
+                    value.cache_clear()
+    figure_cache.clear()
+    if disk:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+def _widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def _select_another(widget):
+    widget.select(next(option for option in widget.options if option not in widget.value))
+
+
+# Interactions applied to the page through AppTest; the data path mirrors them below
+PAGE_INTERACTIONS = {
+    "Home.py": {},
+    "pages/Co2_Emssions.py": {
+        "year slider": lambda at: _widget(at.slider, "Select Year Range:").set_value((2000, 2020)),
+        "checkbox toggle": lambda at: at.sidebar.checkbox[0].uncheck(),
+        "metric select": lambda at: _widget(at.selectbox, "Select a metric to display:").set_value("CO2 Emissions"),
+    },
+    "pages/Manufacturer.py": {
+        "metric select": lambda at: _widget(at.selectbox, "Select metric to plot:").set_value("CO2 Emissions"),
+        "manufacturer multiselect": lambda at: _select_another(_widget(at.multiselect, "Select Manufacturer(s):")),
+    },
+    "pages/Registrations.py": {
+        "year slider": lambda at: _widget(at.slider, "Select Year for Map:").set_value(1950),
+        "checkbox toggle": lambda at: _widget(at.sidebar.checkbox, "Bus").uncheck(),
+    },
+}
+
+
+def _regulation_lines(start, end):
+    from core.regulations import regulation_events
+
+    # The markers the pages draw by default, so the impact tables are part of the cold start
+    return [(event["year"], event["label"]) for event in regulation_events(after=start, until=end)]
+
+
+def _co2_data_path():
+    from core.data import load_vehicle_data
+    from core.emissions import class_chart, class_series, co2_figure, vehicle_type_series
+
+    def figures(types, start, end, metric):
+        co2_figure(types, start, end)
+        class_chart(list(class_series()), metric, lines)
+
+    def aggregate():
+        vehicle_type_series()
+        class_series()
+
+    df = load_vehicle_data()
+    types = list(df["Vehicle Type"].unique())
+    start, end = int(df["Year"].min()), int(df["Year"].max())
+    lines = _regulation_lines(start, end)
+    return load_vehicle_data, aggregate, {
+        "cold": lambda: figures(types, start, end, "Real-World MPG"),
+        "year slider": lambda: figures(types, 2000, 2020, "Real-World MPG"),
+        "checkbox toggle": lambda: figures(types[1:], 2000, 2020, "Real-World MPG"),
+        "metric select": lambda: figures(types[1:], 2000, 2020, "CO2 Emissions"),
+    }
+
+
+def _manufacturer_data_path():
+    from core.manufacturers import filter_manufacturer_years, load_manufacturer_year_table, manufacturer_figure
+
+    table = load_manufacturer_year_table()
+    manufacturers = list(table["Manufacturer"].dropna().unique())
+    lines = _regulation_lines(int(table["Model Year"].min()), int(table["Model Year"].max()))
+    # The page only reads the year table (built from the CSV with one groupby
+    # on a cold start) and filters it per selection
+    return load_manufacturer_year_table, lambda: filter_manufacturer_years(load_manufacturer_year_table(), manufacturers[:3]), {
+        "cold": lambda: manufacturer_figure(manufacturers[:3], "Real-World MPG", "Real-World MPG", regulation_lines=lines),
+        "metric select": lambda: manufacturer_figure(
+            manufacturers[:3], "Real-World CO2 (g/mi)", "CO2 Emissions", regulation_lines=lines,
+        ),
+        "manufacturer multiselect": lambda: manufacturer_figure(
+            manufacturers[:4], "Real-World CO2 (g/mi)", "CO2 Emissions", regulation_lines=lines,
+        ),
+    }
+
+
+def _registration_data_path():
+    from core.data import load_registration_data
+    from core.registrations import VEHICLE_TYPES, load_registration_cube, registration_map_figure, registration_trend_figure
+
+    def figures(year, types):
+        registration_map_figure(year, types)
+        registration_trend_figure([state], start, end, lines, vehicle_types=types)
+
+    df = load_registration_data()
+    state = df["state"].dropna().iloc[0]
+    start, end = int(df["Year"].min()), int(df["Year"].max())
+    lines = _regulation_lines(start, end)
+    return load_registration_data, load_registration_cube, {
+        "cold": lambda: figures(2020, VEHICLE_TYPES),
+        "year slider": lambda: figures(1950, VEHICLE_TYPES),
+        "checkbox toggle": lambda: figures(1950, [t for t in VEHICLE_TYPES if t != "Bus"]),
+    }
+
+
+DATA_PATHS = {
+    "pages/Co2_Emssions.py": _co2_data_path,
+    "pages/Manufacturer.py": _manufacturer_data_path,
+    "pages/Registrations.py": _registration_data_path,
+}
+
+
+def _timed(record, stage, call):
+    start = time.perf_counter()
+    call()
+    record[stage] = record.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def measure_data_path(page):
+    """{scenario: {stage: ms}} for one pass over a page's data path."""
+    load, aggregate, figures = DATA_PATHS[page]()
+    results = {}
+    for scenario, disk in [("cold", True), ("restart", False)]:
+        reset_caches(disk)
+        record = results[scenario] = {}
+        _timed(record, "load", load)
+        _timed(record, "aggregate", aggregate)
+        _timed(record, "figure", figures["cold"])
+    for scenario, build in figures.items():
+        if scenario != "cold":
+            record = results[scenario] = {}
+            _timed(record, "load", load)
+            _timed(record, "aggregate", aggregate)
+            _timed(record, "figure", build)
+    return results
+
+
+def measure_page(page):
+    """{scenario: {"page": ms}} for one headless session on ``page``."""
+    from streamlit.testing.v1 import AppTest
+
+    def run(scenario):
+        _timed(results.setdefault(scenario, {}), "page", at.run)
+        errors = [element.value for element in list(at.exception) + list(at.error)]
+        if errors:
+            raise RuntimeError(f"{page} ({scenario}): {errors[0]}")
+
+    results = {}
+    for scenario, disk in [("cold", True), ("restart", False)]:
+        reset_caches(disk)
+        # Starting from Home.py keeps the pages' st.page_link targets resolvable
+        at = AppTest.from_file(os.path.join(ROOT, "Home.py"), default_timeout=600)
+        if page != "Home.py":
+            at.switch_page(page)
+        run(scenario)
+    for scenario, interact in PAGE_INTERACTIONS[page].items():
+        interact(at)
+        run(scenario)
+    return results
+
+
+def run_worker(repeat):
+    """Measure every page ``repeat`` times in this interpreter; one record per median."""
+    # One untimed pass so module imports (see core.startup_report) stay out of the numbers
+    for page in PAGE_INTERACTIONS:
+        measure_page(page)
+    runs = []
+    for _ in range(repeat):
+        for page in PAGE_INTERACTIONS:
+            measured = measure_page(page)
+            if page in DATA_PATHS:
+                for scenario, stages in measure_data_path(page).items():
+                    measured.setdefault(scenario, {}).update(stages)
+            runs += [(page, scenario, stage, ms) for scenario, stages in measured.items() for stage, ms in stages.items()]
+    samples = {}
+    for page, scenario, stage, ms in runs:
+        samples.setdefault((page, scenario, stage), []).append(ms)
+    return [
+        {"page": page, "scenario": scenario, "stage": stage, "ms": statistics.median(values)}
+        for (page, scenario, stage), values in samples.items()
+    ]
+
+
+def run(scales, repeat):
+    """Records of every scale, each measured in its own interpreter."""
+    records = []
+    for scale in scales:
+        data_dir = tempfile.mkdtemp(prefix=f"emission-tracker-x{scale}-")
+        try:
+            write_scaled_data(data_dir, scale)
+            env = dict(os.environ, EMISSION_TRACKER_DATA_DIR=data_dir)
+            result = subprocess.run(
+                [sys.executable, "-m", "core.benchmark", "--worker", "--repeat", str(repeat)],
+                cwd=ROOT, env=env, capture_output=True, text=True,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip().splitlines()[-1])
+            records += [dict(record, scale=scale) for record in json.loads(result.stdout.splitlines()[-1])]
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return records
+
+
+def format_table(records, scales):
+    table = {}
+    for record in records:
+        table.setdefault((record["page"], record["scenario"], record["stage"]), {})[record["scale"]] = record["ms"]
+    order = {name: i for i, name in enumerate(PAGE_INTERACTIONS)}
+    scenario_order = ["cold", "restart"]
+    rows = sorted(table, key=lambda key: (
+        order[key[0]], scenario_order.index(key[1]) if key[1] in scenario_order else 2, STAGES.index(key[2]),
+    ))
+    lines = [f"{'page':<24}{'scenario':<26}{'stage':<11}" + "".join(f"{f'x{s} ms':>11}" for s in scales)]
+    for page, scenario, stage in rows:
+        cells = table[page, scenario, stage]
+        lines.append(f"{page:<24}{scenario:<26}{stage:<11}" + "".join(f"{cells.get(s, float('nan')):>11.1f}" for s in scales))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark page and data-path latency on scaled synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="dataset size multipliers")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (the median is reported)")
+    parser.add_argument("--json", help="also write the raw records to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        print(json.dumps(run_worker(args.repeat)))
+        return
+    print(f"source data: {DATA_DIR}")
+    records = run(args.scales, args.repeat)
+    print(format_table(records, args.scales))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(records, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
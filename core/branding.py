@@ -0,0 +1,79 @@
+import base64
+import io
+import os
+from functools import lru_cache
+
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Served by Streamlit at app/static/ when server.enableStaticServing is on (.streamlit/config.toml)
+STATIC_DIR = os.path.join(ROOT, "static")
+
+LOGO_PATH = os.path.join(ROOT, "data", "logoE.png")
+GLOBE_LOGO_PATH = os.path.join(ROOT, "data", "logoGLOBE.png")
+
+
+def _resized_png(path, width):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        height = round(image.height * width / image.width)
+        buffer = io.BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def build_static_logo(path, width):
+    """Write ``path`` downsized to ``width`` into static/ and return the file name.
+
+    Rebuilt only when the source image is newer than the static copy.
+    """
+    name = f"{os.path.splitext(os.path.basename(path))[0]}_{width}.png"
+    target = os.path.join(STATIC_DIR, name)
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_resized_png(path, width))
+        os.replace(tmp, target)
+    return name
+
+
+@lru_cache(maxsize=8)
+def _logo_src(path, mtime, width, static_serving):
+    if static_serving:
+        try:
+            return f"app/static/{build_static_logo(path, width)}"
+        except OSError:
+            pass
+    # Without static serving (or a writable static/), inline the downsized image, encoded once per process
+    return f"data:image/png;base64,{base64.b64encode(_resized_png(path, width)).decode()}"
+
+
+def logo_src(path, width):
+    """URL of the logo at its display width, or a cached data URI as a fallback."""
+    return _logo_src(path, os.path.getmtime(path), width, bool(st.get_option("server.enableStaticServing")))
+
+
+def show_logo(path=LOGO_PATH, width=400, alt="logo", style="text-align: center;"):
+    """Render a logo in a div with the given inline style (nothing if the file is missing)."""
+    if not os.path.exists(path):
+        return
+    st.markdown(
+        f"""
+        <div style="{style}">
+            <img src="{logo_src(path, width)}" alt="{alt}" width="{width}">
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+
+def show_globe_logo():
+    """The small globe shown in the top-right corner of every page."""
+    show_logo(GLOBE_LOGO_PATH, width=80, alt="globe", style="position: absolute; top: 30px; right: 30px;")
+
+
+if __name__ == "__main__":
+    for source, width in [(LOGO_PATH, 400), (GLOBE_LOGO_PATH, 80)]:
+        print(f"{os.path.basename(source)} -> static/{build_static_logo(source, width)}")
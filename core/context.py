@@ -0,0 +1,87 @@
+import re
+from functools import lru_cache
+
+from core.perf import metrics_logger
+
+# Prompt sizes reach stderr with EMISSION_TRACKER_PERF=log or panel
+logger = metrics_logger(__name__)
+
+# Prompt budget used when CHAT_TOKEN_BUDGET is not set
+DEFAULT_TOKEN_BUDGET = 3000
+# Tokens OpenAI adds around every message for the role and separators
+MESSAGE_OVERHEAD = 4
+# Length of each earlier message's excerpt in the summary
+SUMMARY_EXCERPT_CHARS = 160
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text):
+    """Tokens in ``text``: exact with tiktoken installed, else ~4 characters per token."""
+    encoder = _encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text))
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+def _excerpt(text):
+    # First sentence, cut to SUMMARY_EXCERPT_CHARS
+    text = " ".join(text.split())
+    first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    return first if len(first) <= SUMMARY_EXCERPT_CHARS else first[:SUMMARY_EXCERPT_CHARS - 1] + "…"
+
+
+def _summary_message(messages):
+    lines = [f"- {m['role']}: {_excerpt(m['content'])}" for m in messages]
+    return {"role": "system", "content": "Summary of the earlier conversation:\n" + "\n".join(lines)}
+
+
+def build_prompt(system_prompt, history, budget=DEFAULT_TOKEN_BUDGET):
+    """Messages to send for ``history`` within ``budget`` tokens, plus a usage report.
+
+    The newest messages are kept verbatim while they fit (the latest one
+    always is). Older ones are condensed into a one-line-per-message
+    summary, and dropped oldest first if even the summary does not fit.
+    """
+    system = {"role": "system", "content": system_prompt}
+    remaining = budget - message_tokens(system)
+
+    recent = []
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if recent and cost > remaining:
+            break
+        recent.insert(0, message)
+        remaining -= cost
+
+    older = history[:len(history) - len(recent)]
+    summarized = list(older)
+    summary = None
+    while summarized:
+        summary = _summary_message(summarized)
+        if message_tokens(summary) <= remaining:
+            break
+        summarized.pop(0)
+        summary = None
+
+    messages = [system] + ([summary] if summary else []) + recent
+    report = {
+        "tokens": sum(message_tokens(m) for m in messages),
+        "budget": budget,
+        "verbatim": len(recent),
+        "summarized": len(summarized) if summary else 0,
+        "dropped": len(older) - (len(summarized) if summary else 0),
+    }
+    logger.info("chat prompt: %(tokens)d/%(budget)d tokens, %(verbatim)d verbatim, %(summarized)d summarized, %(dropped)d dropped", report)
+    return messages, report
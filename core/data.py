@@ -0,0 +1,264 @@
+import importlib.util
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+from core.paths import CACHE_DIR, DATA_DIR
+from core.perf import stage
+
+# Copy-on-write keeps the cached frames safe from pages that derive new
+# columns from them (always on from pandas 3.0)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Paths to the datasets (the bundled ones unless EMISSION_TRACKER_DATA_DIR points elsewhere)
+VEHICLE_DATA_PATH = os.path.join(DATA_DIR, "Data_by_Vehicle.csv")
+MANUFACTURER_DATA_PATH = os.path.join(DATA_DIR, "Manufacturer_Response.csv")
+REGISTRATION_DATA_PATH = os.path.join(DATA_DIR, "Motor_Vehicle_Registrations_Dashboard_data.csv")
+
+# Sources bigger than this are streamed in chunks by core.ingest and only
+# their aggregates are kept in memory
+CHUNKED_INGEST_BYTES = int(os.environ.get("EMISSION_TRACKER_CHUNKED_INGEST_BYTES", 64 * 1024 * 1024))
+
+# Metric columns shared by the EPA vehicle and manufacturer files
+METRIC_COLUMNS = [
+    "Real-World MPG", "Real-World MPG_City", "Real-World MPG_Hwy",
+    "Real-World CO2 (g/mi)", "Real-World CO2_City (g/mi)", "Real-World CO2_Hwy (g/mi)",
+    "Weight (lbs)", "Horsepower (HP)",
+]
+
+# Mapping full state names to abbreviations
+STATE_ABBREVIATIONS = {
+    "Alabama": "AL", "Alaska": "AK", "Arizona": "AZ", "Arkansas": "AR", "California": "CA", "Colorado": "CO", "Connecticut": "CT",
+    "Delaware": "DE", "Florida": "FL", "Georgia": "GA", "Hawaii": "HI", "Idaho": "ID", "Illinois": "IL", "Indiana": "IN", "Iowa": "IA",
+    "Kansas": "KS", "Kentucky": "KY", "Louisiana": "LA", "Maine": "ME", "Maryland": "MD", "Massachusetts": "MA", "Michigan": "MI", "Minnesota": "MN",
+    "Mississippi": "MS", "Missouri": "MO", "Montana": "MT", "Nebraska": "NE", "Nevada": "NV", "New Hampshire": "NH", "New Jersey": "NJ",
+    "New Mexico": "NM", "New York": "NY", "North Carolina": "NC", "North Dakota": "ND", "Ohio": "OH", "Oklahoma": "OK", "Oregon": "OR",
+    "Pennsylvania": "PA", "Rhode Island": "RI", "South Carolina": "SC", "South Dakota": "SD", "Tennessee": "TN", "Texas": "TX", "Utah": "UT",
+    "Vermont": "VT", "Virginia": "VA", "Washington": "WA", "West Virginia": "WV", "Wisconsin": "WI", "Wyoming": "WY",
+    # Not states, but reported alongside them by FHWA
+    "District of Columbia": "DC", "Puerto Rico": "PR",
+}
+
+
+# Typed columnar copies of the CSVs live in CACHE_DIR; bump CACHE_VERSION
+# whenever the cleaning below changes so stale files are rebuilt
+CACHE_VERSION = 2
+
+# Checked without importing pyarrow; pandas imports it on the first Parquet read
+HAS_PARQUET = importlib.util.find_spec("pyarrow") is not None
+
+# Serve the typed frames from the memory-mapped store shared by all workers (core.store)
+SHARED_STORE = os.environ.get("EMISSION_TRACKER_STORE", "").strip().lower() in ("1", "true")
+
+
+def file_version(path):
+    """Cache key for a data file: its absolute path and version.
+
+    The version is the modification time, or the published version when the
+    shared store serves the file.
+    """
+    path = os.path.abspath(path)
+    if SHARED_STORE:
+        from core.store import published_version
+        version = published_version(path)
+        if version is not None:
+            return path, version
+    return path, os.path.getmtime(path)
+
+
+def _read_only(df):
+    # A shallow copy is O(columns); with copy-on-write any write to it
+    # copies the touched column first, so the cached frame never changes
+    return df.copy(deep=False)
+
+
+def _to_float(df, columns):
+    for column in columns:
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    return df
+
+
+def _to_year(df, column):
+    # Rows such as "Prelim. 2024" have no usable year and are dropped
+    df[column] = pd.to_numeric(df[column], errors="coerce")
+    df = df.dropna(subset=[column])
+    df[column] = df[column].astype("int64")
+    return df
+
+
+# Float columns of the vehicle file after clean_vehicle_frame renames them
+VEHICLE_FLOAT_COLUMNS = [
+    "Production Share", "Real-World MPG", "Real-World MPG_City", "Real-World MPG_Hwy",
+    "CO2 Emissions", "CO2 Emissions City", "CO2 Emissions Hwy",
+    "Weight (lbs)", "Horsepower (HP)", "Footprint (sq. ft.)",
+]
+REGISTRATION_COLUMNS = ["Auto", "Bus", "Truck", "Motorcycle"]
+
+# pd.read_csv options of each source ("-" marks missing EPA figures)
+EPA_READ_OPTIONS = {"na_values": ["-"]}
+
+
+def clean_vehicle_frame(df):
+    df = df.rename(columns={"Model Year": "Year", "Real-World CO2 (g/mi)": "CO2 Emissions", "Real-World CO2_City (g/mi)": "CO2 Emissions City", "Real-World CO2_Hwy (g/mi)": "CO2 Emissions Hwy"})
+    df = _to_year(df, "Year")
+    df = _to_float(df, VEHICLE_FLOAT_COLUMNS)
+    df = df.dropna(subset=["CO2 Emissions"])
+    df["Regulatory Class"] = df["Regulatory Class"].astype("category")
+    df["Vehicle Type"] = df["Vehicle Type"].astype("category")
+    return df.reset_index(drop=True)
+
+
+def clean_manufacturer_frame(df):
+    df = _to_year(df, "Model Year")
+    df = _to_float(df, METRIC_COLUMNS + ["Footprint (sq. ft.)"])
+    df["Manufacturer"] = df["Manufacturer"].astype("category")
+    df["Regulatory Class"] = df["Regulatory Class"].astype("category")
+    return df.reset_index(drop=True)
+
+
+def clean_registration_frame(df):
+    df = df.rename(columns={"year": "Year"})
+    df = _to_year(df, "Year")
+    df = _to_float(df, REGISTRATION_COLUMNS)
+    df["state"] = df["state"].map(STATE_ABBREVIATIONS).astype("category")
+    return df.reset_index(drop=True)
+
+
+def is_large(path):
+    return os.path.getsize(path) > CHUNKED_INGEST_BYTES
+
+
+def parse_vehicle_csv(path):
+    """Typed vehicle data; large files are aggregated per year, class and type while streaming."""
+    if is_large(path):
+        from core.ingest import ingest_vehicle_data
+        with stage("chunked ingest"):
+            return ingest_vehicle_data(path)
+    with stage("csv read"):
+        df = pd.read_csv(path, **EPA_READ_OPTIONS)
+    with stage("type casts"):
+        return clean_vehicle_frame(df)
+
+
+def parse_manufacturer_csv(path):
+    """Typed manufacturer data; large files are aggregated per manufacturer, year and class."""
+    if is_large(path):
+        from core.ingest import ingest_manufacturer_detail
+        with stage("chunked ingest"):
+            return ingest_manufacturer_detail(path)
+    with stage("csv read"):
+        df = pd.read_csv(path, **EPA_READ_OPTIONS)
+    with stage("type casts"):
+        return clean_manufacturer_frame(df)
+
+
+def parse_registration_csv(path):
+    """Typed registrations; large files are summed per year and state while streaming."""
+    if is_large(path):
+        from core.ingest import ingest_registrations
+        with stage("chunked ingest"):
+            return ingest_registrations(path)
+    with stage("csv read"):
+        df = pd.read_csv(path)
+    with stage("type casts"):
+        return clean_registration_frame(df)
+
+
+def cache_path_for(path, suffix=""):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{name}{suffix}.v{CACHE_VERSION}.parquet")
+
+
+def _write_parquet(df, target):
+    # Write to a temporary file first so concurrent readers never see a partial file
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+
+
+def read_typed(path, parse, suffix=""):
+    """Read a CSV through its typed Parquet copy, rebuilding it when the CSV is newer.
+
+    ``parse`` turns the CSV into the frame to store; ``suffix`` tells apart
+    several frames derived from the same CSV. Falls back to calling ``parse``
+    when pyarrow is missing or the cache directory is not writable. With
+    SHARED_STORE, a frame published in core.store is mapped instead.
+    """
+    if SHARED_STORE:
+        from core.store import read_published
+        with stage("store map"):
+            df = read_published(path, suffix)
+        if df is not None:
+            return df
+    if not HAS_PARQUET:
+        return parse(path)
+    target = cache_path_for(path, suffix)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        with stage("parquet read"):
+            return pd.read_parquet(target)
+    df = parse(path)
+    try:
+        with stage("parquet write"):
+            _write_parquet(df, target)
+    except OSError:
+        pass
+    return df
+
+
+@lru_cache(maxsize=8)
+def _load_vehicle_data(path, mtime):
+    return read_typed(path, parse_vehicle_csv)
+
+
+@lru_cache(maxsize=8)
+def _load_manufacturer_data(path, mtime):
+    return read_typed(path, parse_manufacturer_csv)
+
+
+@lru_cache(maxsize=8)
+def _load_registration_data(path, mtime):
+    return read_typed(path, parse_registration_csv)
+
+
+def load_vehicle_data(path=VEHICLE_DATA_PATH):
+    """CO2 and fuel economy by model year, regulatory class and vehicle type.
+
+    Loaded and cleaned once per process and reloaded when the file changes.
+    The returned frame is shared between sessions, so treat it as read-only.
+    """
+    return _read_only(_load_vehicle_data(*file_version(path)))
+
+
+def load_manufacturer_data(path=MANUFACTURER_DATA_PATH):
+    """Per-manufacturer EPA metrics by model year (cached like load_vehicle_data)."""
+    return _read_only(_load_manufacturer_data(*file_version(path)))
+
+
+def load_registration_data(path=REGISTRATION_DATA_PATH):
+    """Vehicle registrations per state and year (cached like load_vehicle_data)."""
+    return _read_only(_load_registration_data(*file_version(path)))
+
+
+def build_caches():
+    """Preprocessing step: (re)build the typed copies the pages read."""
+    from core.manufacturers import build_manufacturer_year_table
+
+    # The pages only read the manufacturer x model year table, not the raw rows
+    for path, suffix, parse in [
+        (VEHICLE_DATA_PATH, "", parse_vehicle_csv),
+        (MANUFACTURER_DATA_PATH, ".by_year", build_manufacturer_year_table),
+        (REGISTRATION_DATA_PATH, "", parse_registration_csv),
+    ]:
+        target = cache_path_for(path, suffix)
+        _write_parquet(parse(path), target)
+        print(f"{os.path.basename(path)} -> {os.path.relpath(target, DATA_DIR)}")
+    # Derived from the typed copies, so built last
+    from core.regulations import build_impact_caches
+    build_impact_caches()
+
+
+if __name__ == "__main__":
+    build_caches()
@@ -0,0 +1,161 @@
+from functools import lru_cache
+
+import pandas as pd
+
+from core.data import VEHICLE_DATA_PATH, file_version, load_vehicle_data
+from core.figcache import cached_figure
+from core.lod import downsample_frame, max_points_for_width
+from core.perf import timed
+
+# Metrics averaged per model year and regulatory class for the comparison chart
+CLASS_METRICS = [
+    "Real-World MPG", "Weight (lbs)", "Horsepower (HP)", "Real-World MPG_City", "Real-World MPG_Hwy",
+    "CO2 Emissions", "CO2 Emissions City", "CO2 Emissions Hwy",
+]
+
+
+@lru_cache(maxsize=8)
+@timed("groupby vehicle types")
+def _vehicle_type_series(path, mtime):
+    df = load_vehicle_data(path)
+    return {
+        vehicle_type: group[["Year", "CO2 Emissions"]].sort_values("Year").reset_index(drop=True)
+        for vehicle_type, group in df.groupby("Vehicle Type", observed=True, sort=False)
+    }
+
+
+@lru_cache(maxsize=8)
+@timed("groupby class means")
+def _class_means(path, mtime):
+    df = load_vehicle_data(path)
+    return df.groupby(["Year", "Regulatory Class"], as_index=False, observed=True)[CLASS_METRICS].mean()
+
+
+@lru_cache(maxsize=8)
+def _class_series(path, mtime):
+    means = _class_means(path, mtime)
+    return {
+        vehicle_class: group.reset_index(drop=True)
+        for vehicle_class, group in means.groupby("Regulatory Class", observed=True, sort=False)
+    }
+
+
+def vehicle_type_series(path=VEHICLE_DATA_PATH):
+    """Year and CO2 series of every vehicle type, keyed by type in file order."""
+    return _vehicle_type_series(*file_version(path))
+
+
+def class_means(path=VEHICLE_DATA_PATH):
+    """Per-year means of CLASS_METRICS by regulatory class, as one read-only frame."""
+    return _class_means(*file_version(path)).copy(deep=False)
+
+
+def class_series(path=VEHICLE_DATA_PATH):
+    """Per-year means of CLASS_METRICS for every regulatory class, keyed by class."""
+    return _class_series(*file_version(path))
+
+
+@lru_cache(maxsize=512)
+def _co2_trace(path, mtime, vehicle_type, start_year, end_year, lod_method):
+    series = _vehicle_type_series(path, mtime)[vehicle_type]
+    series = series[(series["Year"] >= start_year) & (series["Year"] <= end_year)]
+    if lod_method:
+        series = downsample_frame(series, "Year", "CO2 Emissions", max_points_for_width(), method=lod_method)
+    import plotly.express as px
+
+    # Colours follow the file order of the types so a trace keeps its colour when others are toggled
+    palette = px.colors.qualitative.Set1
+    color = palette[list(_vehicle_type_series(path, mtime)).index(vehicle_type) % len(palette)]
+    return dict(
+        type="scatter", mode="lines", name=vehicle_type, legendgroup=vehicle_type,
+        x=series["Year"].to_numpy(), y=series["CO2 Emissions"].to_numpy(),
+        line=dict(color=color, width=2),
+        hovertemplate=f"Vehicle Type={vehicle_type}<br>Year=%{{x}}<br>CO2 Emissions (g/mi)=%{{y}}<extra></extra>",
+    )
+
+
+@cached_figure("co2_by_vehicle_type")
+def _co2_figure(path, mtime, vehicle_types, start_year, end_year, lod_method):
+    import plotly.graph_objects as go
+
+    fig = go.Figure([_co2_trace(path, mtime, v, start_year, end_year, lod_method) for v in vehicle_types])
+    fig.update_layout(
+        title="CO2 Emissions by Vehicle Type Over Time",
+        height=500, margin=dict(l=40, r=40, t=40, b=40),
+        hovermode="x unified",
+        legend_title_text="Vehicle Type",
+        title_font=dict(size=18, family="Arial", color="white"),
+        font=dict(family="Arial", size=14, color="white")
+    )
+    fig.update_xaxes(showgrid=True, dtick=10, type="linear", title_text="Year")
+    fig.update_yaxes(showgrid=True, title_text="CO2 Emissions (g/mi)")
+    return fig
+
+
+def co2_figure(vehicle_types, start_year, end_year, lod_method=None, path=VEHICLE_DATA_PATH):
+    """CO2 line chart for the selected vehicle types and year range.
+
+    Each type's trace is memoized and complete figures live in the shared
+    figure cache, so toggling one type only builds (at most) one new trace.
+    ``lod_method`` ("lttb" or "mean") downsamples series longer than the
+    chart can show.
+    """
+    return _co2_figure(*file_version(path), tuple(vehicle_types), int(start_year), int(end_year), lod_method)
+
+
+@cached_figure("class_comparison")
+def _class_chart(path, mtime, classes, metric, regulation_lines):
+    import altair as alt
+
+    series = _class_series(path, mtime)
+    data = pd.concat([series[c][["Year", "Regulatory Class", metric]] for c in classes], ignore_index=True)
+
+    # Base line chart
+    chart = alt.Chart(data).mark_line().encode(
+        x=alt.X("Year:O", title="Year", axis=alt.Axis(format="d")),
+        y=alt.Y(metric, title=metric),
+        color="Regulatory Class:N"
+    )
+
+    if regulation_lines:
+        from core.regulations import impact_annotations
+
+        regulation_df = pd.DataFrame(list(regulation_lines), columns=["Year", "Label"])
+        # Measured change of each class around the regulation, shown on hover
+        notes = impact_annotations("class", path, mtime, regulation_df["Year"], [(c, c, metric) for c in classes])
+        regulation_df["Window"] = [notes.get(year, {}).get("window", "") for year in regulation_df["Year"]]
+        tooltip = [alt.Tooltip("Label:N", title="Regulation"), alt.Tooltip("Window:N", title=metric)]
+        for i, vehicle_class in enumerate(classes):
+            regulation_df[f"impact_{i}"] = [notes.get(year, {}).get("lines", {}).get(vehicle_class, "n/a") for year in regulation_df["Year"]]
+            tooltip.append(alt.Tooltip(f"impact_{i}:N", title=vehicle_class))
+
+        vlines = alt.Chart(regulation_df).mark_rule(color='black', strokeWidth=2).encode(
+            x=alt.X('Year:O'),
+            tooltip=tooltip
+        )
+
+        labels = alt.Chart(regulation_df).mark_text(
+            align='left',
+            baseline='bottom',
+            dx=3,
+            dy=-3
+        ).encode(
+            x=alt.X('Year:O'),
+            text='Label',
+            tooltip=tooltip
+        )
+
+        chart += vlines + labels
+
+    return chart
+
+
+def class_chart(classes, metric, regulation_lines=(), path=VEHICLE_DATA_PATH):
+    """Altair comparison chart of ``metric`` for the selected regulatory classes.
+
+    ``regulation_lines`` is a sequence of (year, label) pairs drawn as rules,
+    with each class's precomputed before/after change in their tooltips.
+    Assembled from the pre-aggregated per-class series and kept in the
+    shared figure cache.
+    """
+    return _class_chart(*file_version(path), tuple(classes), metric, tuple(regulation_lines))
@@ -0,0 +1,176 @@
+import json
+import math
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+from core.data import (
+    CACHE_DIR, MANUFACTURER_DATA_PATH, REGISTRATION_DATA_PATH, STATE_ABBREVIATIONS, VEHICLE_DATA_PATH,
+    file_version, load_registration_data, load_vehicle_data,
+)
+from core.manufacturers import load_manufacturer_year_table
+from core.registrations import VEHICLE_TYPES
+
+FACTS_VERSION = 2
+FACTS_PATH = os.path.join(CACHE_DIR, f"facts.v{FACTS_VERSION}.json")
+# Facts injected into the prompt per question
+DEFAULT_TOP_K = 5
+
+STOPWORDS = {
+    "a", "about", "after", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "has",
+    "have", "how", "in", "is", "it", "its", "me", "of", "on", "or", "since", "than", "that", "the", "their", "this",
+    "to", "was", "were", "what", "when", "which", "who", "why", "will", "with",
+}
+# Words folded onto the tags the facts are indexed under
+SYNONYMS = {
+    "carbon": "co2", "emission": "co2", "emissions": "co2", "gram": "co2", "grams": "co2",
+    "economy": "mpg", "efficiency": "mpg", "efficient": "mpg", "mileage": "mpg", "fuel": "mpg",
+    "registered": "registration", "registrations": "registration", "vehicles": "registration",
+    "car": "car", "cars": "car", "automobile": "auto", "automobiles": "auto",
+    "trucks": "truck", "buses": "bus", "motorcycles": "motorcycle",
+    "heavy": "weight", "horsepower": "hp", "power": "hp",
+    "maker": "manufacturer", "makers": "manufacturer", "brand": "manufacturer", "brands": "manufacturer",
+}
+STATE_NAMES = {abbr: name for name, abbr in STATE_ABBREVIATIONS.items()}
+
+
+def tokenize(text):
+    """Lower-case keyword set of ``text`` with stopwords removed and synonyms folded."""
+    tokens = set()
+    for word in re.findall(r"[a-z0-9]+", text.lower().replace("'s", "")):
+        if word in STOPWORDS:
+            continue
+        word = SYNONYMS.get(word, word)
+        if len(word) > 4 and word.endswith("s") and not word.isdigit():
+            word = word[:-1]
+        tokens.add(word)
+    return tokens
+
+
+def _vehicle_facts(df):
+    facts = []
+    columns = ["Year", "Regulatory Class", "Vehicle Type", "CO2 Emissions", "Real-World MPG", "Weight (lbs)", "Horsepower (HP)"]
+    for year, vehicle_class, vehicle_type, co2, mpg, weight, hp in df[columns].itertuples(index=False, name=None):
+        subject = "all new vehicles" if vehicle_type == "All" else f"new {vehicle_type} vehicles ({vehicle_class} class)"
+        text = f"In model year {year}, {subject} averaged {co2:.0f} g/mi real-world CO2, {mpg:.1f} mpg, {weight:.0f} lbs and {hp:.0f} hp."
+        facts.append((text, f"{year} {vehicle_class} {vehicle_type} co2 mpg weight hp"))
+    for vehicle_type, group in df.groupby("Vehicle Type", observed=True):
+        first, last = group.iloc[0], group.iloc[-1]
+        best = group.loc[group["CO2 Emissions"].idxmin()]
+        change = (last["CO2 Emissions"] - first["CO2 Emissions"]) / first["CO2 Emissions"] * 100
+        text = (f"CO2 of {vehicle_type} vehicles went from {first['CO2 Emissions']:.0f} g/mi in {first['Year']} to "
+                f"{last['CO2 Emissions']:.0f} g/mi in {last['Year']} ({change:+.0f}%); the lowest was {best['CO2 Emissions']:.0f} g/mi in {best['Year']}.")
+        facts.append((text, f"{vehicle_type} co2 trend change drop lowest history"))
+    return facts
+
+
+def _manufacturer_facts(df):
+    facts = []
+    columns = ["Manufacturer", "Model Year", "Real-World CO2 (g/mi)", "Real-World MPG"]
+    for manufacturer, year, co2, mpg in df[columns].itertuples(index=False, name=None):
+        if math.isnan(co2):
+            continue
+        text = f"In model year {year}, {manufacturer} vehicles averaged {co2:.0f} g/mi real-world CO2 and {mpg:.1f} mpg."
+        facts.append((text, f"{year} {manufacturer} manufacturer co2 mpg"))
+    latest = df["Model Year"].max()
+    ranked = df[df["Model Year"] == latest].dropna(subset=["Real-World CO2 (g/mi)"]).sort_values("Real-World CO2 (g/mi)")
+    if len(ranked):
+        order = ", ".join(f"{m} ({v:.0f})" for m, v in zip(ranked["Manufacturer"], ranked["Real-World CO2 (g/mi)"]))
+        facts.append((f"Manufacturers ranked by real-world CO2 in model year {latest}, lowest first (g/mi): {order}.",
+                      f"{latest} manufacturer ranking best worst lowest highest co2"))
+    return facts
+
+
+def _registration_facts(df):
+    facts = []
+    df = df.dropna(subset=["state"])
+    totals = df[VEHICLE_TYPES].sum(axis=1, min_count=1)
+    for row, total in zip(df[["Year", "state"] + VEHICLE_TYPES].itertuples(index=False, name=None), totals):
+        if math.isnan(total):
+            continue
+        year, name, counts = row[0], STATE_NAMES[row[1]], row[2:]
+        parts = ", ".join(f"{n:,.0f} {v.lower()}" for v, n in zip(VEHICLE_TYPES, counts) if not math.isnan(n))
+        facts.append((f"In {year}, {name} had {total:,.0f} registered vehicles ({parts}).",
+                      f"{year} {name} registration auto bus truck motorcycle"))
+    latest = int(df["Year"].max())
+    by_state = df[df["Year"] == latest].assign(total=totals).sort_values("total", ascending=False)
+    top = ", ".join(f"{STATE_NAMES[s]} ({t:,.0f})" for s, t in zip(by_state["state"], by_state["total"]))
+    facts.append((f"States ranked by registered vehicles in {latest}: {top}.", f"{latest} state ranking most largest registration"))
+    return facts
+
+
+def build_fact_index():
+    """Facts (sentence, keyword string) from the three datasets and an inverted keyword index."""
+    facts = (_vehicle_facts(load_vehicle_data()) + _manufacturer_facts(load_manufacturer_year_table())
+             + _registration_facts(load_registration_data()))
+    return FactIndex([text for text, _ in facts], [sorted(tokenize(keywords)) for _, keywords in facts])
+
+
+class FactIndex:
+    """Keyword index over precomputed fact sentences, matched locally per question."""
+
+    def __init__(self, texts, keywords):
+        self.texts = texts
+        self.keywords = keywords
+        self.postings = defaultdict(list)
+        for i, words in enumerate(keywords):
+            for word in words:
+                self.postings[word].append(i)
+        self.idf = {word: math.log(len(texts) / len(ids)) for word, ids in self.postings.items()}
+
+    def search(self, question, k=DEFAULT_TOP_K):
+        """Up to ``k`` facts sharing the most informative keywords with ``question``."""
+        scores = defaultdict(float)
+        for word in tokenize(question):
+            for i in self.postings.get(word, ()):
+                scores[i] += self.idf[word]
+        best = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:k]
+        return [self.texts[i] for i, _ in best]
+
+    def save(self, path, sources):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"sources": sources, "texts": self.texts, "keywords": self.keywords}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, sources):
+        """Index saved for exactly these source versions, else None."""
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get("sources") != sources:
+            return None
+        return cls(saved["texts"], saved["keywords"])
+
+
+@lru_cache(maxsize=2)
+def _load_fact_index(sources):
+    sources = [list(source) for source in sources]
+    index = FactIndex.load(FACTS_PATH, sources)
+    if index is None:
+        index = build_fact_index()
+        try:
+            index.save(FACTS_PATH, sources)
+        except OSError:
+            pass
+    return index
+
+
+def load_fact_index():
+    """Fact index for the current data files, built once and persisted in data/cache."""
+    return _load_fact_index(tuple(file_version(p) for p in (VEHICLE_DATA_PATH, MANUFACTURER_DATA_PATH, REGISTRATION_DATA_PATH)))
+
+
+def relevant_facts(question, k=DEFAULT_TOP_K):
+    """The ``k`` facts from the datasets that best match ``question``."""
+    return load_fact_index().search(question, k)
+
+
+def facts_prompt(facts):
+    """System prompt section listing ``facts``."""
+    return "Relevant figures from the dashboard's datasets (EPA Automotive Trends, FHWA registrations):\n" + "\n".join(f"- {fact}" for fact in facts)
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+
+from core.perf import timed
+
+# Number of built figures kept per server process (shared by all sessions)
+FIGURE_CACHE_SIZE = int(os.environ.get("EMISSION_TRACKER_FIGURE_CACHE_SIZE", "256"))
+
+
+def _normalize(value):
+    # Reduce filter state to plain JSON values so equal selections hash equally
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(v) for v in value), key=repr)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def state_key(namespace, *args, **kwargs):
+    """Stable hash of a chart builder's name and its filter state."""
+    payload = json.dumps([namespace, _normalize(args), _normalize(kwargs)], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class FigureCache:
+    """Thread-safe LRU cache of built figures and chart specs.
+
+    Cached objects are handed to every session that asks for the same
+    state, so callers must not modify them.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # Build outside the lock; two sessions racing on a new key both build it once
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+figure_cache = FigureCache()
+
+
+def cached_figure(namespace):
+    """Decorator memoizing a chart builder in the shared figure cache.
+
+    The builder's arguments are its filter state; include the data file
+    version among them so a changed CSV produces new figures.
+    """
+    def decorator(build):
+        timed_build = timed(f"figure {namespace}")(build)
+
+        @wraps(build)
+        def wrapper(*args, **kwargs):
+            key = state_key(namespace, *args, **kwargs)
+            return figure_cache.get_or_build(key, lambda: timed_build(*args, **kwargs))
+        return wrapper
+    return decorator
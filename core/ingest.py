@@ -0,0 +1,156 @@
+"""Out-of-core ingestion for full-size EPA and FHWA extracts.
+
+The sources are read ``CHUNK_ROWS`` rows at a time; each chunk is validated,
+typed with the same cleaning as the in-memory loaders and folded into running
+per-key sums and counts, so memory stays bounded by the number of groups
+rather than the number of rows. The results have the schema of the regular
+loaders, just one row per group:
+
+    python -m core.ingest [--chunksize N]
+
+streams every source in the data directory and writes the aggregates to the
+typed caches the pages read.
+"""
+import argparse
+import logging
+import os
+
+import pandas as pd
+
+from core.data import (
+    DATA_DIR, EPA_READ_OPTIONS, MANUFACTURER_DATA_PATH, METRIC_COLUMNS, REGISTRATION_COLUMNS, REGISTRATION_DATA_PATH,
+    VEHICLE_DATA_PATH, VEHICLE_FLOAT_COLUMNS, _write_parquet, cache_path_for, clean_manufacturer_frame,
+    clean_registration_frame, clean_vehicle_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.environ.get("EMISSION_TRACKER_CHUNK_ROWS", 200_000))
+
+VEHICLE_KEYS = ["Year", "Regulatory Class", "Vehicle Type"]
+MANUFACTURER_KEYS = ["Manufacturer", "Model Year"]
+MANUFACTURER_DETAIL_KEYS = MANUFACTURER_KEYS + ["Regulatory Class"]
+REGISTRATION_KEYS = ["Year", "state"]
+
+# Raw header each source must have (before cleaning renames anything)
+VEHICLE_SOURCE_COLUMNS = [
+    "Model Year", "Regulatory Class", "Vehicle Type", "Real-World CO2 (g/mi)",
+    "Real-World CO2_City (g/mi)", "Real-World CO2_Hwy (g/mi)",
+] + [c for c in VEHICLE_FLOAT_COLUMNS if not c.startswith("CO2")]
+MANUFACTURER_SOURCE_COLUMNS = ["Manufacturer", "Model Year", "Regulatory Class"] + METRIC_COLUMNS + ["Footprint (sq. ft.)"]
+REGISTRATION_SOURCE_COLUMNS = ["year", "state"] + REGISTRATION_COLUMNS
+
+
+class RunningAggregate:
+    """Per-key sums and non-missing counts, merged one chunk at a time."""
+
+    def __init__(self, keys, columns):
+        self.keys = keys
+        self.columns = columns
+        self._parts = None
+        self.rows = 0
+
+    def add(self, df):
+        df = df.dropna(subset=self.keys)
+        self.rows += len(df)
+        part = df.groupby(self.keys, observed=True)[self.columns].agg(["sum", "count"])
+        if self._parts is not None:
+            # Only the running totals and this chunk's groups are ever held
+            part = pd.concat([self._parts, part]).groupby(level=self.keys).sum()
+        self._parts = part
+
+    def _stat(self, name):
+        if self._parts is None:
+            index = pd.MultiIndex.from_arrays([[] for _ in self.keys], names=self.keys)
+            return pd.DataFrame(columns=self.columns, index=index, dtype="float64")
+        return self._parts.xs(name, axis=1, level=1)[self.columns].astype("float64")
+
+    def sums(self):
+        """Sums per key; NaN where a column had no values at all (like ``sum(min_count=1)``)."""
+        return self._stat("sum").where(self._stat("count") > 0)
+
+    def means(self):
+        return self._stat("sum") / self._stat("count").where(lambda counts: counts > 0)
+
+
+def read_chunks(path, required_columns, chunksize=None, **read_options):
+    """Yield raw chunks of ``path``, checking its header against ``required_columns``."""
+    reader = pd.read_csv(path, chunksize=chunksize or CHUNK_ROWS, **read_options)
+    with reader:
+        for number, chunk in enumerate(reader):
+            if number == 0:
+                missing = [c for c in required_columns if c not in chunk.columns]
+                if missing:
+                    raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(missing)}")
+            yield chunk
+
+
+def _aggregate(path, required_columns, clean, keys, columns, how, chunksize, read_options):
+    running = RunningAggregate(keys, columns)
+    read = 0
+    for chunk in read_chunks(path, required_columns, chunksize, **read_options):
+        read += len(chunk)
+        running.add(clean(chunk))
+    logger.info(
+        "ingested %s: %d rows read, %d kept, %d rejected",
+        os.path.basename(path), read, running.rows, read - running.rows,
+    )
+    df = getattr(running, how)().reset_index()
+    for key in keys:
+        if pd.api.types.is_numeric_dtype(df[key]):
+            df[key] = df[key].astype("int64")
+        else:
+            df[key] = df[key].astype("category")
+    return df
+
+
+def ingest_vehicle_data(path=VEHICLE_DATA_PATH, chunksize=None):
+    """Mean vehicle metrics per model year, regulatory class and vehicle type."""
+    df = _aggregate(
+        path, VEHICLE_SOURCE_COLUMNS, clean_vehicle_frame, VEHICLE_KEYS, VEHICLE_FLOAT_COLUMNS, "means",
+        chunksize, EPA_READ_OPTIONS,
+    )
+    return df.dropna(subset=["CO2 Emissions"]).reset_index(drop=True)
+
+
+def ingest_manufacturer_data(path=MANUFACTURER_DATA_PATH, chunksize=None):
+    """Mean manufacturer metrics per manufacturer and model year (the manufacturer year table)."""
+    return _aggregate(
+        path, MANUFACTURER_SOURCE_COLUMNS, clean_manufacturer_frame, MANUFACTURER_KEYS, METRIC_COLUMNS, "means",
+        chunksize, EPA_READ_OPTIONS,
+    )
+
+
+def ingest_manufacturer_detail(path=MANUFACTURER_DATA_PATH, chunksize=None):
+    """Mean manufacturer metrics per manufacturer, model year and regulatory class."""
+    return _aggregate(
+        path, MANUFACTURER_SOURCE_COLUMNS, clean_manufacturer_frame, MANUFACTURER_DETAIL_KEYS,
+        METRIC_COLUMNS + ["Footprint (sq. ft.)"], "means", chunksize, EPA_READ_OPTIONS,
+    )
+
+
+def ingest_registrations(path=REGISTRATION_DATA_PATH, chunksize=None):
+    """Registrations summed per year and state (rows with an unknown state are rejected)."""
+    return _aggregate(
+        path, REGISTRATION_SOURCE_COLUMNS, clean_registration_frame, REGISTRATION_KEYS, REGISTRATION_COLUMNS, "sums",
+        chunksize, {},
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the source extracts into the typed caches.")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows read per chunk")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for path, ingest, suffix in [
+        (VEHICLE_DATA_PATH, ingest_vehicle_data, ""),
+        (REGISTRATION_DATA_PATH, ingest_registrations, ""),
+        (MANUFACTURER_DATA_PATH, ingest_manufacturer_data, ".by_year"),
+    ]:
+        target = cache_path_for(path, suffix)
+        _write_parquet(ingest(path, chunksize=args.chunksize), target)
+        print(f"{os.path.basename(path)} -> {os.path.relpath(target, DATA_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from core.perf import metrics_logger
+
+# Stream timings reach stderr with EMISSION_TRACKER_PERF=log or panel
+logger = metrics_logger(__name__)
+
+SYSTEM_PROMPT = "You are an environmental science expert. Only answer questions about vehicle emissions, fuel efficiency, pollution, or related environmental impacts."
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+class BackendUnavailable(Exception):
+    """The chat backend refused or failed the request (rate limit, outage, ...)."""
+
+
+class ChatBackend(ABC):
+    """Interface of the chat backends: ``stream`` yields the answer in text chunks.
+
+    ``messages`` is the OpenAI-style list of {"role", "content"} dicts,
+    system prompt included. Closing the returned generator must cancel the
+    request.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def stream(self, messages):
+        """Yield the answer to ``messages`` in text chunks."""
+
+
+class OpenAIBackend(ChatBackend):
+    """OpenAI chat completions through the process-wide AsyncChatClient."""
+
+    name = "openai"
+
+    def __init__(self, api_key, model=DEFAULT_MODEL, base_url=None, max_concurrency=8):
+        from core.ai_client import AsyncChatClient
+
+        self.model = model
+        self.client = AsyncChatClient(api_key, base_url=base_url, max_concurrency=max_concurrency)
+
+    def stream(self, messages):
+        return self.client.stream(self.model, messages)
+
+
+class FakeBackend(ChatBackend):
+    """Local stand-in for tests and demos: streams a canned answer word by word."""
+
+    name = "fake"
+
+    def __init__(self, reply=None, first_token_delay=0.3, token_delay=0.03):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    def stream(self, messages):
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        # Echo the dataset facts injected into the (first) system prompt, if any
+        facts = [line[2:] for m in messages[:1] if m["role"] == "system" for line in m["content"].splitlines() if line.startswith("- ")]
+        reply = self.reply or " ".join([f"(offline answer) You asked: {question}", *facts[:2]] if facts else [
+            f"(offline answer) You asked: {question} Real-world CO2 and fuel economy trends are shown on the dashboard pages."
+        ])
+        time.sleep(self.first_token_delay)
+        for i, word in enumerate(reply.split(" ")):
+            if i:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else f" {word}"
+
+
+class TimedStream:
+    """Iterates a chunk stream while recording time to first token and total time."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._started = time.perf_counter()
+        self.parts = []
+        self.first_token_s = None
+        self.total_s = None
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self.first_token_s is None:
+                self.first_token_s = time.perf_counter() - self._started
+            self.parts.append(chunk)
+            yield chunk
+        self.total_s = time.perf_counter() - self._started
+        logger.info("chat stream finished: first_token_s=%.3f total_s=%.3f chunks=%d", self.first_token_s or 0, self.total_s, len(self.parts))
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    @property
+    def finished(self):
+        return self.total_s is not None
+
+    def close(self):
+        # Cancels the underlying request if the stream was interrupted
+        if hasattr(self._chunks, "close"):
+            self._chunks.close()
+
+
+@lru_cache(maxsize=4)
+def get_backend(name, api_key=None, model=DEFAULT_MODEL, base_url=None, max_concurrency=8, cache_ttl_s=0, cache_max_entries=1000):
+    """Backend by name ("openai" or "fake"), shared by all sessions.
+
+    ``base_url`` points the OpenAI backend at another server (e.g.
+    core.mock_server) and ``max_concurrency`` caps its requests in flight.
+    With a non-zero ``cache_ttl_s`` the backend is wrapped in the on-disk
+    response cache.
+    """
+    if name == "fake":
+        backend = FakeBackend()
+    elif not api_key:
+        raise BackendUnavailable("OPENAI_API_KEY is not configured")
+    else:
+        backend = OpenAIBackend(api_key, model, base_url=base_url, max_concurrency=max_concurrency)
+    if cache_ttl_s:
+        import sqlite3
+
+        from core.response_cache import CachedBackend, ResponseCache
+
+        try:
+            backend = CachedBackend(backend, ResponseCache(ttl_s=cache_ttl_s, max_entries=cache_max_entries))
+        except (OSError, sqlite3.Error):
+            logger.warning("response cache unavailable, answering every question from %s", backend.name)
+    return backend
+
+
+def get_setting(secrets, name, default=None):
+    """Look ``name`` up in Streamlit secrets, then in the environment."""
+    try:
+        return secrets[name]
+    except (KeyError, FileNotFoundError):
+        return os.environ.get(name, default)
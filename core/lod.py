@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Assumed plot width and the spacing below which extra points are not visible
+CHART_WIDTH_PX = 800
+PX_PER_POINT = 8
+
+# Level-of-detail choices offered in the page sidebars, mapped to downsample_frame methods
+LOD_OPTIONS = {
+    "Full resolution": None,
+    "Simplified (shape-preserving)": "lttb",
+    "Simplified (bucket averages)": "mean",
+}
+
+
+def max_points_for_width(width_px=CHART_WIDTH_PX, px_per_point=PX_PER_POINT):
+    return max(3, int(width_px // px_per_point))
+
+
+def lttb_indices(x, y, threshold):
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of ``threshold - 2``
+    equal buckets in between, the point forming the largest triangle with
+    the previously kept point and the mean of the next bucket.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def bucket_means(x, y, buckets):
+    """Mean x and y over ``buckets`` equal-width slices of the x range."""
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    if buckets >= len(x):
+        return x, y
+    bins = np.minimum(((x - x.min()) / (np.ptp(x) or 1) * buckets).astype(int), buckets - 1)
+    counts = np.bincount(bins, minlength=buckets)
+    filled = counts > 0
+    mean_x = np.bincount(bins, weights=x, minlength=buckets)[filled] / counts[filled]
+    mean_y = np.bincount(bins, weights=y, minlength=buckets)[filled] / counts[filled]
+    return mean_x, mean_y
+
+
+def downsample_frame(df, x, y, max_points, group=None, method="lttb"):
+    """Reduce every ``group`` series of ``df`` to at most ``max_points`` points.
+
+    Series already short enough (e.g. a zoomed-in year range) are returned
+    at full resolution; missing values are dropped before reducing.
+    """
+    if max_points is None:
+        return df
+    parts = []
+    for key, part in (df.groupby(group, observed=True, sort=False) if group else [(None, df)]):
+        part = part.dropna(subset=[y]).sort_values(x)
+        if len(part) > max_points:
+            if method == "mean":
+                mean_x, mean_y = bucket_means(part[x], part[y], max_points)
+                reduced = pd.DataFrame({x: mean_x, y: mean_y})
+                if group:
+                    reduced[group] = key
+                part = reduced
+            else:
+                part = part.iloc[lttb_indices(part[x], part[y], max_points)]
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True) if parts else df.iloc[:0]
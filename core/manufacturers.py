@@ -0,0 +1,94 @@
+from functools import lru_cache
+
+from core.data import MANUFACTURER_DATA_PATH, METRIC_COLUMNS, file_version, is_large, parse_manufacturer_csv, read_typed
+from core.figcache import cached_figure
+from core.perf import timed
+
+
+def aggregate_manufacturer_years(df):
+    """Mean of every metric per manufacturer and model year."""
+    return df.groupby(["Manufacturer", "Model Year"], observed=True)[METRIC_COLUMNS].mean().reset_index()
+
+
+@timed("groupby manufacturer years")
+def build_manufacturer_year_table(path):
+    """Manufacturer x model year means straight from the source (streamed if large)."""
+    if is_large(path):
+        from core.ingest import ingest_manufacturer_data
+        return ingest_manufacturer_data(path)
+    # Parsed rather than loaded: the page only keeps this table, not the raw rows
+    return aggregate_manufacturer_years(parse_manufacturer_csv(path))
+
+
+@lru_cache(maxsize=8)
+def _load_manufacturer_year_table(path, mtime):
+    return read_typed(path, build_manufacturer_year_table, suffix=".by_year")
+
+
+def load_manufacturer_year_table(path=MANUFACTURER_DATA_PATH):
+    """Manufacturer x model year means, persisted in data/cache next to the typed CSV copy.
+
+    Shared between sessions, so treat the returned frame as read-only.
+    """
+    return _load_manufacturer_year_table(*file_version(path)).copy(deep=False)
+
+
+def filter_manufacturer_years(df, manufacturers=None, start_year=None, end_year=None):
+    """Rows of the manufacturer x year table for the given manufacturers and years."""
+    mask = df["Model Year"].notna()
+    if manufacturers is not None:
+        mask &= df["Manufacturer"].isin(list(manufacturers))
+    if start_year is not None:
+        mask &= df["Model Year"] >= int(start_year)
+    if end_year is not None:
+        mask &= df["Model Year"] <= int(end_year)
+    return df[mask]
+
+
+@cached_figure("manufacturer_trend")
+def _manufacturer_figure(path, mtime, manufacturers, metric, metric_label, start_year, regulation_lines):
+    import plotly.express as px
+
+    filtered_df = filter_manufacturer_years(_load_manufacturer_year_table(path, mtime), manufacturers, start_year)
+
+    # Create line chart
+    fig = px.line(
+        filtered_df,
+        x="Model Year",
+        y=metric,
+        color="Manufacturer",
+        title=f"{metric_label} Over Time",
+        labels={metric: metric_label, "Model Year": "Model Year"}
+    )
+
+    if regulation_lines:
+        from core.regulations import hover_text, impact_annotations
+
+        # Precomputed change of each manufacturer around the regulation, shown on hover
+        notes = impact_annotations(
+            "manufacturer", path, mtime, [year for year, _ in regulation_lines], [(m, m, metric) for m in manufacturers],
+        )
+        for year, label in regulation_lines:
+            hover = {"annotation_hovertext": hover_text(notes[year], metric_label)} if year in notes else {}
+            fig.add_vline(
+                x=year, line_dash="dash", line_color="black", annotation_text=label, annotation_position="top right", **hover,
+            )
+
+    fig.update_layout(height=500, margin=dict(l=40, r=40, t=40, b=40))
+    return fig
+
+
+def manufacturer_figure(manufacturers, metric, metric_label, start_year=None, regulation_lines=(), path=MANUFACTURER_DATA_PATH):
+    """Trend of ``metric`` for the selected manufacturers, from ``start_year`` on if given.
+
+    ``regulation_lines`` are (year, label) markers whose hover text gives each
+    manufacturer's precomputed change around the regulation; those before
+    ``start_year`` are left out. Served from the shared figure cache; the
+    selection order does not matter.
+    """
+    start_year = None if start_year is None else int(start_year)
+    # Markers before the first plotted year would stretch the axis back to them
+    regulation_lines = [(year, label) for year, label in regulation_lines if start_year is None or year >= start_year]
+    return _manufacturer_figure(
+        *file_version(path), tuple(sorted(manufacturers)), metric, metric_label, start_year, tuple(regulation_lines),
+    )
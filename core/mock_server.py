@@ -0,0 +1,93 @@
+"""Local stand-in for the OpenAI chat completions API, for load and retry tests.
+
+    python -m core.mock_server --port 8765 --rate-limit-every 3 --delay 0.05
+
+then point the chat page at it with OPENAI_BASE_URL = "http://127.0.0.1:8765/v1"
+(any OPENAI_API_KEY works). Answers are streamed as server-sent events,
+and every Nth request can be rejected with 429 to exercise the backoff.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "This is a mock answer about vehicle emissions, streamed one word at a time."
+
+
+def make_handler(rate_limit_every=0, delay=0.05, first_token_delay=0.2):
+    counter = itertools.count(1)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=()):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            with lock:
+                n = next(counter)
+            if rate_limit_every and n % rate_limit_every == 0:
+                self._send_json(429, {"error": {"message": "mock rate limit", "type": "rate_limit_error"}}, [("Retry-After", "0.1")])
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            time.sleep(first_token_delay)
+            for i, word in enumerate(ANSWER.split(" ")):
+                chunk = {
+                    "id": f"mock-{n}", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else f" {word}"}, "finish_reason": None}],
+                }
+                try:
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                time.sleep(delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(port=8765, **options):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(**options))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between streamed words")
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    args = parser.parse_args()
+    server = serve(args.port, rate_limit_every=args.rate_limit_every, delay=args.delay, first_token_delay=args.first_token_delay)
+    print(f"mock OpenAI API on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
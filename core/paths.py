@@ -0,0 +1,7 @@
+"""Data and cache directories, importable without pandas (e.g. by the chat page)."""
+import os
+
+# The bundled datasets unless EMISSION_TRACKER_DATA_DIR points elsewhere
+DATA_DIR = os.environ.get("EMISSION_TRACKER_DATA_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+# Everything generated from the data (typed copies, store, chat answers) lives here
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
@@ -0,0 +1,153 @@
+"""Per-stage wall time and memory of page reruns.
+
+Off by default. ``EMISSION_TRACKER_PERF=log`` records every instrumented stage
+(CSV read, type casts, aggregation, figure build, chart serialization) and
+logs one JSON line per rerun to stderr on the ``core.perf`` logger; ``panel``
+also shows the stages in a sidebar panel. When off, ``stage`` returns a
+shared no-op context manager and ``timed`` leaves the function untouched.
+"""
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+MODE = os.environ.get("EMISSION_TRACKER_PERF", "").strip().lower()
+ENABLED = MODE in ("1", "true", "log", "panel")
+SHOW_PANEL = MODE == "panel"
+
+
+def metrics_logger(name):
+    """Logger for timing and size reports of ``name``.
+
+    Streamlit leaves the root logger without handlers, so with
+    instrumentation on the logger gets its own INFO handler on stderr
+    (and does not propagate, so configured apps do not see lines twice).
+    """
+    log = logging.getLogger(name)
+    if ENABLED and not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    return log
+
+
+logger = metrics_logger(__name__)
+
+_NULL = nullcontext()
+_local = threading.local()
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+def _rss_mb():
+    # Current resident set size on Linux, peak RSS elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+
+
+@contextmanager
+def _measure(name):
+    run = getattr(_local, "run", None)
+    depth = getattr(_local, "depth", 0)
+    record = {"stage": name, "depth": depth}
+    if run is not None:
+        # Appended up front so nested stages are listed under their parent
+        run["stages"].append(record)
+    _local.depth = depth + 1
+    rss = _rss_mb()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        record["rss_delta_mb"] = round(_rss_mb() - rss, 2)
+        _local.depth = depth
+        with _totals_lock:
+            total = _totals.setdefault(name, {"count": 0, "ms": 0.0, "max_ms": 0.0})
+            total["count"] += 1
+            total["ms"] += record["ms"]
+            total["max_ms"] = max(total["max_ms"], record["ms"])
+        if run is None:
+            logger.info(json.dumps({"event": "stage", **record}))
+
+
+def stage(name):
+    """Context manager timing one stage of the current rerun."""
+    return _measure(name) if ENABLED else _NULL
+
+
+def timed(name):
+    """Decorator form of ``stage``; a no-op when instrumentation is off."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_run(page):
+    """Start collecting the stages of one rerun of ``page`` on this thread."""
+    if ENABLED:
+        _local.run = {"page": page, "start": time.perf_counter(), "rss_mb": _rss_mb(), "stages": []}
+        _local.depth = 0
+
+
+def end_run():
+    """Finish the current rerun: log it and, in panel mode, show it in the sidebar."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+    summary = {
+        "event": "rerun", "page": run["page"],
+        "total_ms": round((time.perf_counter() - run["start"]) * 1000, 3),
+        "rss_mb": round(_rss_mb(), 1), "rss_delta_mb": round(_rss_mb() - run["rss_mb"], 2),
+        "stages": run["stages"],
+    }
+    logger.info(json.dumps(summary))
+    if SHOW_PANEL:
+        _show_panel(summary)
+    return summary
+
+
+def totals():
+    """Process-wide count, total and max ms per stage since start-up."""
+    with _totals_lock:
+        return {name: dict(total) for name, total in _totals.items()}
+
+
+def _show_panel(summary):
+    import streamlit as st
+
+    with st.sidebar.expander(f"Performance: {summary['total_ms']:.0f} ms", expanded=False):
+        st.caption(f"RSS {summary['rss_mb']:.0f} MB ({summary['rss_delta_mb']:+.1f} MB this rerun)")
+        if summary["stages"]:
+            st.dataframe(
+                [
+                    {"stage": "  " * s["depth"] + s["stage"], "ms": s["ms"], "RSS Δ MB": s["rss_delta_mb"]}
+                    for s in summary["stages"]
+                ],
+                hide_index=True,
+            )
+        else:
+            st.caption("Every stage was served from cache.")
+        st.caption("Process totals")
+        st.dataframe(
+            [{"stage": name, **total} for name, total in sorted(totals().items(), key=lambda item: -item[1]["ms"])],
+            hide_index=True,
+        )
@@ -0,0 +1,135 @@
+"""Filtering and aggregation behind the dashboard pages, usable without Streamlit.
+
+Every query takes plain filter arguments (``None`` means "no filter"),
+works on the cached typed data and returns a DataFrame; ``to_columns``
+turns it into a compact columnar dict for JSON. core.api serves these
+over HTTP.
+"""
+import math
+
+from core.data import METRIC_COLUMNS, load_vehicle_data
+from core.emissions import CLASS_METRICS, class_means
+from core.manufacturers import filter_manufacturer_years, load_manufacturer_year_table
+from core.registrations import COMPARISON_VIEWS, STATE_GROUPS, VEHICLE_TYPES, load_registration_cube, resolve_series
+from core.regulations import IMPACT_SOURCES, impact_table
+
+
+def _year_mask(years, start_year, end_year):
+    mask = years.notna()
+    if start_year is not None:
+        mask &= years >= int(start_year)
+    if end_year is not None:
+        mask &= years <= int(end_year)
+    return mask
+
+
+def _check(values, allowed, what):
+    unknown = sorted(set(values) - set(allowed))
+    if unknown:
+        raise ValueError(f"unknown {what}: {', '.join(map(str, unknown))}")
+    return values
+
+
+def co2_by_vehicle_type(vehicle_types=None, start_year=None, end_year=None):
+    """Real-world CO2 (g/mi) per model year and vehicle type."""
+    df = load_vehicle_data()
+    mask = _year_mask(df["Year"], start_year, end_year)
+    if vehicle_types is not None:
+        _check(list(vehicle_types), df["Vehicle Type"].dropna().unique(), "vehicle type")
+        mask &= df["Vehicle Type"].isin(list(vehicle_types))
+    return df.loc[mask, ["Year", "Vehicle Type", "CO2 Emissions"]].reset_index(drop=True)
+
+
+def class_metrics(classes=None, metrics=None, start_year=None, end_year=None):
+    """Per-year means of the chosen metrics (default: all) by regulatory class."""
+    metrics = CLASS_METRICS if metrics is None else _check(list(metrics), CLASS_METRICS, "metric")
+    df = class_means()
+    mask = _year_mask(df["Year"], start_year, end_year)
+    if classes is not None:
+        _check(list(classes), df["Regulatory Class"].dropna().unique(), "class")
+        mask &= df["Regulatory Class"].isin(list(classes))
+    return df.loc[mask, ["Year", "Regulatory Class", *metrics]].reset_index(drop=True)
+
+
+def manufacturer_trends(manufacturers=None, metrics=None, start_year=None, end_year=None):
+    """Per-year means of the chosen metrics (default: all) by manufacturer."""
+    metrics = METRIC_COLUMNS if metrics is None else _check(list(metrics), METRIC_COLUMNS, "metric")
+    table = load_manufacturer_year_table()
+    if manufacturers is not None:
+        _check(list(manufacturers), table["Manufacturer"].dropna().unique(), "manufacturer")
+    df = filter_manufacturer_years(table, manufacturers, start_year, end_year)
+    return df[["Manufacturer", "Model Year", *metrics]].reset_index(drop=True)
+
+
+def registration_map(year, vehicle_types=None, exclude_california=False):
+    """Total registrations of the chosen vehicle types per state in ``year``."""
+    import pandas as pd
+
+    vehicle_types = VEHICLE_TYPES if vehicle_types is None else _check(list(vehicle_types), VEHICLE_TYPES, "vehicle type")
+    states, totals = load_registration_cube().map_totals(year, vehicle_types, ["CA"] if exclude_california else [])
+    return pd.DataFrame({"state": states, "Total Vehicles": totals})
+
+
+def registration_trend(states=None, vehicle_types=None, start_year=None, end_year=None, exclude_california=False):
+    """Registrations per year, state and vehicle type."""
+    cube = load_registration_cube()
+    if vehicle_types is not None:
+        _check(list(vehicle_types), VEHICLE_TYPES, "vehicle type")
+    if states is None:
+        states = list(cube.states)
+    _check(list(states), cube.states, "state")
+    if exclude_california:
+        states = [s for s in states if s != "CA"]
+    return cube.trend(states, vehicle_types, start_year, end_year)
+
+
+def registration_comparison(states=None, vehicle_types=None, start_year=None, end_year=None, view="total", window=1):
+    """Registration totals of states and regions per year, as totals, growth, shares or an index."""
+    cube = load_registration_cube()
+    if vehicle_types is not None:
+        _check(list(vehicle_types), VEHICLE_TYPES, "vehicle type")
+    if states is None:
+        states = list(STATE_GROUPS)
+    _check(list(states), list(cube.states) + list(STATE_GROUPS), "state or region")
+    _check([view], list(COMPARISON_VIEWS.values()), "view")
+    if int(window) < 1:
+        raise ValueError("window must be at least 1")
+    return cube.compare(resolve_series(states), vehicle_types, start_year, end_year, view=view, window=int(window))
+
+
+def regulation_impacts(dimension="class", entities=None, metrics=None, event_years=None):
+    """Precomputed before/after change of each regulation event per class, manufacturer or state."""
+    _check([dimension], list(IMPACT_SOURCES), "dimension")
+    df = impact_table(dimension)
+    mask = df["Event Year"].notna()
+    if entities is not None:
+        _check(list(entities), df["Entity"].unique(), "entity")
+        mask &= df["Entity"].isin(list(entities))
+    if metrics is not None:
+        _check(list(metrics), df["Metric"].unique(), "metric")
+        mask &= df["Metric"].isin(list(metrics))
+    if event_years is not None:
+        mask &= df["Event Year"].isin([int(year) for year in event_years])
+    return df[mask].reset_index(drop=True)
+
+
+QUERIES = {
+    "co2": co2_by_vehicle_type,
+    "classes": class_metrics,
+    "manufacturers": manufacturer_trends,
+    "registrations/map": registration_map,
+    "registrations/trend": registration_trend,
+    "registrations/compare": registration_comparison,
+    "regulations/impacts": regulation_impacts,
+}
+
+
+def to_columns(df):
+    """{"columns": [...], "data": {column: [values]}} with NaN as None."""
+    data = {}
+    for column in df.columns:
+        values = df[column].tolist()
+        if df[column].dtype.kind == "f":
+            values = [None if math.isnan(v) else v for v in values]
+        data[str(column)] = values
+    return {"columns": [str(c) for c in df.columns], "rows": len(df), "data": data}
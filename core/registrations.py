@@ -0,0 +1,303 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from core.data import REGISTRATION_DATA_PATH, file_version, load_registration_data
+from core.figcache import cached_figure
+from core.lod import downsample_frame, max_points_for_width
+from core.perf import timed
+
+VEHICLE_TYPES = ["Auto", "Bus", "Truck", "Motorcycle"]
+
+# Census regions, selectable in the comparison chart next to single states
+STATE_GROUPS = {
+    "Northeast": ["CT", "ME", "MA", "NH", "RI", "VT", "NJ", "NY", "PA"],
+    "Midwest": ["IL", "IN", "MI", "OH", "WI", "IA", "KS", "MN", "MO", "NE", "ND", "SD"],
+    "South": ["DE", "DC", "FL", "GA", "MD", "NC", "SC", "VA", "WV", "AL", "KY", "MS", "TN", "AR", "LA", "OK", "TX"],
+    "West": ["AZ", "CO", "ID", "MT", "NV", "NM", "UT", "WY", "AK", "CA", "HI", "OR", "WA"],
+}
+
+# Comparison views: label -> how the registration totals are shown
+COMPARISON_VIEWS = {
+    "Registrations": "total",
+    "Growth rate (% per year)": "growth",
+    "Share of the selection (%)": "share",
+    "Index (first year = 100)": "index",
+}
+
+
+def _growth(values):
+    growth = np.full_like(values, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth[1:] = (values[1:] / values[:-1] - 1) * 100
+    growth[~np.isfinite(growth)] = np.nan
+    return growth
+
+
+def _share(values):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values / np.nansum(values, axis=1, keepdims=True) * 100
+
+
+def _index(values):
+    # Divide every series by its first reported value in the year range
+    first = np.argmax(np.isfinite(values), axis=0)
+    base = np.take_along_axis(values, first[np.newaxis], axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        indexed = values / base * 100
+    indexed[~np.isfinite(indexed)] = np.nan
+    return indexed
+
+
+def rolling_mean(values, window):
+    """Trailing ``window``-year mean along the first axis, skipping NaN."""
+    if window <= 1:
+        return values
+    valid = np.isfinite(values)
+    zero = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([zero, np.cumsum(np.where(valid, values, 0), axis=0)])
+    counts = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts[end] - counts[start] > 0, (sums[end] - sums[start]) / (counts[end] - counts[start]), np.nan)
+
+
+def resolve_series(labels):
+    """{label: states} for state abbreviations and STATE_GROUPS names."""
+    return {label: STATE_GROUPS.get(label, [label]) for label in labels}
+
+
+def overlapping_states(labels):
+    """States that belong to more than one of ``labels`` (e.g. CA and West), sorted."""
+    members = [state for states in resolve_series(labels).values() for state in states]
+    return sorted({state for state in members if members.count(state) > 1})
+
+
+class RegistrationCube:
+    """Registrations as a dense year x state x vehicle type array.
+
+    ``values[y, s, v]`` holds the registrations of ``VEHICLE_TYPES[v]`` in
+    ``states[s]`` during ``years[y]`` (NaN where the source has no figure) and
+    ``present[y, s]`` records whether the state reported that year at all.
+    All arrays are read-only because one cube is shared by every session.
+    """
+
+    def __init__(self, years, states, values, present):
+        self.years = years
+        self.states = states
+        self.values = values
+        self.present = present
+        for array in (self.years, self.states, self.values, self.present):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_frame(cls, df):
+        df = df.dropna(subset=["state"])
+        # Some state/year pairs appear twice (an empty row next to the real one)
+        grouped = df.groupby(["Year", "state"], observed=True)[VEHICLE_TYPES].sum(min_count=1)
+        years = np.arange(df["Year"].min(), df["Year"].max() + 1)
+        states = pd.Index(sorted(grouped.index.get_level_values("state").unique()))
+        year_idx = grouped.index.get_level_values("Year").to_numpy() - years[0]
+        state_idx = states.get_indexer(grouped.index.get_level_values("state"))
+
+        values = np.full((len(years), len(states), len(VEHICLE_TYPES)), np.nan)
+        values[year_idx, state_idx] = grouped.to_numpy(dtype="float64")
+        present = np.zeros((len(years), len(states)), dtype=bool)
+        present[year_idx, state_idx] = True
+        return cls(years, states.to_numpy(dtype=object), values, present)
+
+    def year_index(self, year):
+        """Row of ``year`` in the cube, or None when it is out of range."""
+        i = int(year) - int(self.years[0])
+        return i if 0 <= i < len(self.years) else None
+
+    def type_indices(self, vehicle_types):
+        return [VEHICLE_TYPES.index(v) for v in vehicle_types]
+
+    def year_slice(self, start_year=None, end_year=None):
+        """Rows of the years between ``start_year`` and ``end_year`` (inclusive)."""
+        first = int(self.years[0])
+        start = 0 if start_year is None else max(int(start_year) - first, 0)
+        stop = len(self.years) if end_year is None else max(int(end_year) - first + 1, 0)
+        return slice(start, stop)
+
+    def state_indices(self, states):
+        """Positions of ``states`` in the cube; unknown states are skipped."""
+        positions = pd.Index(self.states).get_indexer(list(states))
+        return positions[positions >= 0]
+
+    def trend(self, states=None, vehicle_types=None, start_year=None, end_year=None):
+        """Long frame of registrations (Year, state, Vehicle Type, Registrations).
+
+        One index slice of the cube, flattened year-major; state/year pairs
+        with no report are left out.
+        """
+        years = self.year_slice(start_year, end_year)
+        state_idx = np.arange(len(self.states)) if states is None else self.state_indices(states)
+        types = VEHICLE_TYPES if vehicle_types is None else [v for v in VEHICLE_TYPES if v in vehicle_types]
+        block = self.values[years][:, state_idx][:, :, self.type_indices(types)]
+        present = np.repeat(self.present[years][:, state_idx], len(types))
+        n_years, n_states = block.shape[:2]
+        frame = pd.DataFrame({
+            "Year": np.repeat(self.years[years], n_states * len(types)),
+            "state": np.tile(np.repeat(self.states[state_idx], len(types)), n_years),
+            "Vehicle Type": np.tile(types, n_years * n_states),
+            "Registrations": block.reshape(-1),
+        })
+        return frame[present].reset_index(drop=True)
+
+    def compare(self, series, vehicle_types=None, start_year=None, end_year=None, view="total", window=1, split_types=False):
+        """Long frame (Year, Series[, Vehicle Type], Value) comparing groups of states.
+
+        ``series`` maps each label to its states (see resolve_series); a
+        series totals its states' registrations, with missing figures counted
+        as zero and years where none of them reported left out. ``view`` is
+        one of COMPARISON_VIEWS' values and is applied before the trailing
+        ``window``-year rolling mean; growth and rolling means look back past
+        ``start_year``, the index starts at it. Overlapping series (a state
+        and its region) each count the shared states, so their shares add up
+        to more than 100% (see overlapping_states). All series are computed
+        together as one matrix product over the cube.
+        """
+        types = VEHICLE_TYPES if vehicle_types is None else [v for v in VEHICLE_TYPES if v in vehicle_types]
+        labels = list(series)
+        members = np.zeros((len(self.states), len(labels)))
+        for j, states in enumerate(series.values()):
+            members[self.state_indices(states), j] = 1
+
+        counts = np.nan_to_num(self.values[:, :, self.type_indices(types)])
+        if not split_types:
+            counts = counts.sum(axis=2, keepdims=True)
+        # year x series x type totals; a series reports when any of its states does
+        totals = np.einsum("yst,sg->ygt", counts, members)
+        totals[(self.present @ members) == 0] = np.nan
+
+        if view == "growth":
+            totals = _growth(totals)
+        elif view == "share":
+            totals = _share(totals)
+        totals = rolling_mean(totals, window)
+        years = self.year_slice(start_year, end_year)
+        totals = totals[years]
+        if view == "index":
+            totals = _index(totals)
+
+        n_years, n_series, n_types = totals.shape
+        frame = pd.DataFrame({
+            "Year": np.repeat(self.years[years], n_series * n_types),
+            "Series": np.tile(np.repeat(labels, n_types), n_years),
+            "Vehicle Type": np.tile(types if split_types else ["Selected types"], n_years * n_series),
+            "Value": totals.reshape(-1),
+        })
+        if not split_types:
+            frame = frame.drop(columns="Vehicle Type")
+        return frame.dropna(subset=["Value"]).reset_index(drop=True)
+
+    def map_totals(self, year, vehicle_types, exclude_states=()):
+        """States reporting in ``year`` and the sum of the selected vehicle types.
+
+        Missing figures count as zero, like ``DataFrame.sum`` on the raw rows.
+        """
+        i = self.year_index(year)
+        if i is None:
+            return self.states[:0], np.zeros(0)
+        mask = self.present[i].copy()
+        if exclude_states:
+            mask &= ~np.isin(self.states, list(exclude_states))
+        totals = np.nansum(self.values[i][:, self.type_indices(vehicle_types)], axis=1)
+        return self.states[mask], totals[mask]
+
+
+@lru_cache(maxsize=8)
+@timed("registration cube")
+def _load_registration_cube(path, mtime):
+    return RegistrationCube.from_frame(load_registration_data(path))
+
+
+def load_registration_cube(path=REGISTRATION_DATA_PATH):
+    """Registration cube for ``path``, built once per process and file version."""
+    return _load_registration_cube(*file_version(path))
+
+
+@cached_figure("registration_map")
+def _registration_map_figure(path, mtime, year, vehicle_types, exclude_states):
+    import plotly.express as px
+
+    map_states, map_totals = _load_registration_cube(path, mtime).map_totals(year, vehicle_types, exclude_states)
+    if len(map_states) == 0:
+        return None
+    map_df = pd.DataFrame({"state": map_states, "Total Vehicles": map_totals})
+    fig_map = px.choropleth(
+        map_df, locations="state", locationmode="USA-states", color="Total Vehicles",
+        hover_name="state", title=f"Total Vehicle Registrations in {year}",
+        color_continuous_scale="blues", scope="usa"
+    )
+    fig_map.update_layout(height=500, margin=dict(l=40, r=40, t=40, b=40))
+    return fig_map
+
+
+def registration_map_figure(year, vehicle_types, exclude_states=(), path=REGISTRATION_DATA_PATH):
+    """Choropleth of the selected vehicle types in ``year``, or None without data."""
+    vehicle_types = [v for v in VEHICLE_TYPES if v in vehicle_types]
+    return _registration_map_figure(*file_version(path), int(year), tuple(vehicle_types), tuple(sorted(exclude_states)))
+
+
+@cached_figure("registration_trend")
+def _registration_trend_figure(path, mtime, series, vehicle_types, start_year, end_year, view, window, regulation_lines, lod_method):
+    import plotly.express as px
+
+    # Every series comes from one vectorized pass over the cube
+    split_types = len(series) == 1
+    trend_df = _load_registration_cube(path, mtime).compare(
+        resolve_series(series), vehicle_types, start_year, end_year, view=view, window=window, split_types=split_types,
+    )
+    color = "Vehicle Type" if split_types else "Series"
+    if lod_method:
+        trend_df = downsample_frame(trend_df, "Year", "Value", max_points_for_width(), group=color, method=lod_method)
+
+    view_label = next(label for label, key in COMPARISON_VIEWS.items() if key == view)
+    title = f"Vehicle Registrations in {series[0]}" if split_types else f"Vehicle Registrations by State: {view_label}"
+    if window > 1:
+        title += f" ({window}-year rolling average)"
+    y_label = "Number of Registrations" if view == "total" else view_label
+    fig_reg = px.line(trend_df, x="Year", y="Value", color=color, title=title, labels={"Value": y_label, "Series": "State or region"})
+    if regulation_lines:
+        from core.regulations import hover_text, impact_annotations
+
+        # Precomputed change around each regulation: per vehicle type for one series, else in total
+        years = [year for year, _ in regulation_lines]
+        if split_types:
+            notes = impact_annotations("state", path, mtime, years, [(v, series[0], v) for v in vehicle_types])
+            heading = series[0]
+        else:
+            notes = impact_annotations("state", path, mtime, years, [(name, name, "Registrations") for name in series])
+            heading = "All registrations"
+        for year, label in regulation_lines:
+            hover = {"annotation_hovertext": hover_text(notes[year], heading)} if year in notes else {}
+            fig_reg.add_vline(
+                x=year, line_dash="dash", line_color="black", annotation_text=label, annotation_position="top right", **hover,
+            )
+    fig_reg.update_layout(height=500, margin=dict(l=40, r=40, t=40, b=40))
+    return fig_reg
+
+
+def registration_trend_figure(states, start_year, end_year, regulation_lines=(), lod_method=None,
+                              vehicle_types=VEHICLE_TYPES, view="total", window=1, path=REGISTRATION_DATA_PATH):
+    """Registrations over time for states and STATE_GROUPS regions, with (year, label) regulation markers.
+
+    A single state or region is split by vehicle type; several are compared
+    as totals of ``vehicle_types`` in the given ``view`` (a COMPARISON_VIEWS
+    value), optionally as a ``window``-year rolling average. ``lod_method``
+    ("lttb" or "mean") downsamples year ranges longer than the chart can show.
+    Hovering a marker's label shows the precomputed registration change
+    around that regulation.
+    """
+    if isinstance(states, str):
+        states = [states]
+    vehicle_types = [v for v in VEHICLE_TYPES if v in vehicle_types]
+    return _registration_trend_figure(
+        *file_version(path), tuple(states), tuple(vehicle_types), int(start_year), int(end_year),
+        view, int(window), tuple(regulation_lines), lod_method,
+    )
@@ -0,0 +1,231 @@
+"""Regulation events and their measured effect on the datasets.
+
+REGULATION_EVENTS is the one list of regulations the charts mark. For every
+event, the impact tables compare the ``IMPACT_WINDOW`` years before it with
+the same number of years from the event on. Each table covers one dimension
+(regulatory class, manufacturer or state) and gives, per entity and metric:
+
+- the mean on each side and the change between them;
+- the linear trend (slope per year) on each side;
+- a Welch t statistic.
+
+The statistics are computed together for all entities from year x entity
+matrices. The tables are persisted next to the typed caches and rebuilt only
+when the data, the events or the window change. The charts use them for the
+hover text of their regulation markers.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from core.data import (
+    DATA_DIR, MANUFACTURER_DATA_PATH, REGISTRATION_DATA_PATH, VEHICLE_DATA_PATH, _write_parquet, cache_path_for, file_version,
+    read_typed,
+)
+from core.perf import timed
+
+REGULATION_EVENTS = [
+    {"year": 1975, "label": "CAFE Standards", "name": "CAFE Standards"},
+    {"year": 1994, "label": "Tier 1", "name": "Tier 1 Emissions Standards"},
+    {"year": 2004, "label": "Tier 2", "name": "Tier 2 Emissions Standards"},
+    {"year": 2012, "label": "GHG", "name": "GHG Emissions Regulation"},
+    {"year": 2017, "label": "Tier 3", "name": "Tier 3 Emissions Regulation"},
+]
+# Years compared on each side of an event
+IMPACT_WINDOW = 5
+# Entities listed in one marker's hover text
+MAX_ANNOTATED = 12
+
+# Part of the cache file name, so editing the events or the window rebuilds the tables
+_IMPACTS_KEY = hashlib.sha1(json.dumps([REGULATION_EVENTS, IMPACT_WINDOW]).encode()).hexdigest()[:8]
+IMPACT_COLUMNS = [
+    "Event Year", "Event", "Entity", "Metric", "Years Before", "Years After", "Mean Before", "Mean After",
+    "Change", "Change %", "Slope Before", "Slope After", "Slope Change", "t",
+]
+
+
+def regulation_events(after=None, until=None):
+    """Events later than ``after`` and no later than ``until`` (both optional)."""
+    return [
+        event for event in REGULATION_EVENTS
+        if (after is None or event["year"] > after) and (until is None or event["year"] <= until)
+    ]
+
+
+def window_stats(years, values):
+    """Count, mean, variance and OLS slope per column of ``values`` (rows are ``years``), skipping NaN."""
+    valid = np.isfinite(values)
+    x = np.where(valid, years[:, np.newaxis], 0.0)
+    y = np.where(valid, values, 0.0)
+    n = valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = y.sum(axis=0) / n
+        var = np.where(valid, (values - mean) ** 2, 0.0).sum(axis=0) / (n - 1)
+        sx, sxx, sxy = x.sum(axis=0), (x * x).sum(axis=0), (x * y).sum(axis=0)
+        slope = (n * sxy - sx * y.sum(axis=0)) / (n * sxx - sx * sx)
+    return n, mean, np.where(n > 1, var, np.nan), np.where(n > 1, slope, np.nan)
+
+
+def event_impacts(years, matrix, entities, metric, window=IMPACT_WINDOW):
+    """Impact rows of every event for one metric; ``matrix`` is years x entities."""
+    years = np.asarray(years, dtype="float64")
+    frames = []
+    for event in REGULATION_EVENTS:
+        year = event["year"]
+        before = (years >= year - window) & (years < year)
+        after = (years >= year) & (years < year + window)
+        if not before.any() or not after.any():
+            continue
+        n_b, mean_b, var_b, slope_b = window_stats(years[before], matrix[before])
+        n_a, mean_a, var_a, slope_a = window_stats(years[after], matrix[after])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_pct = (mean_a / mean_b - 1) * 100
+            t = (mean_a - mean_b) / np.sqrt(var_a / n_a + var_b / n_b)
+        frames.append(pd.DataFrame({
+            "Event Year": year, "Event": event["label"], "Entity": entities, "Metric": metric,
+            "Years Before": n_b, "Years After": n_a, "Mean Before": mean_b, "Mean After": mean_a,
+            "Change": mean_a - mean_b, "Change %": change_pct,
+            "Slope Before": slope_b, "Slope After": slope_a, "Slope Change": slope_a - slope_b, "t": t,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=IMPACT_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    numeric = IMPACT_COLUMNS[6:]
+    df[numeric] = df[numeric].where(np.isfinite(df[numeric].to_numpy(dtype="float64")))
+    return df.dropna(subset=["Mean Before", "Mean After"])
+
+
+def _pivot_impacts(df, year_column, entity_column, metrics):
+    table = df.pivot_table(index=year_column, columns=entity_column, values=metrics, observed=True)
+    return pd.concat([
+        event_impacts(table.index.to_numpy(), table[metric].to_numpy(dtype="float64"), table[metric].columns.astype(str), metric)
+        for metric in metrics
+    ], ignore_index=True)
+
+
+def build_class_impacts(path):
+    from core.emissions import CLASS_METRICS, class_means
+
+    return _pivot_impacts(class_means(path), "Year", "Regulatory Class", CLASS_METRICS)
+
+
+def build_manufacturer_impacts(path):
+    from core.data import METRIC_COLUMNS
+    from core.manufacturers import load_manufacturer_year_table
+
+    return _pivot_impacts(load_manufacturer_year_table(path), "Model Year", "Manufacturer", METRIC_COLUMNS)
+
+
+def build_state_impacts(path):
+    from core.registrations import STATE_GROUPS, VEHICLE_TYPES, load_registration_cube, resolve_series
+
+    cube = load_registration_cube(path)
+    # Regions too, so a compared region gets its own figures
+    series = resolve_series(list(cube.states) + list(STATE_GROUPS))
+    totals = cube.compare(series).rename(columns={"Value": "Registrations"})
+    by_type = cube.compare(series, split_types=True).pivot_table(
+        index=["Year", "Series"], columns="Vehicle Type", values="Value", observed=True,
+    ).reset_index()
+    return pd.concat([
+        _pivot_impacts(totals, "Year", "Series", ["Registrations"]),
+        _pivot_impacts(by_type, "Year", "Series", [v for v in VEHICLE_TYPES if v in by_type]),
+    ], ignore_index=True)
+
+
+IMPACT_SOURCES = {
+    "class": (VEHICLE_DATA_PATH, build_class_impacts),
+    "manufacturer": (MANUFACTURER_DATA_PATH, build_manufacturer_impacts),
+    "state": (REGISTRATION_DATA_PATH, build_state_impacts),
+}
+
+
+def _impact_suffix(dimension):
+    return f".impacts-{dimension}-{_IMPACTS_KEY}"
+
+
+@lru_cache(maxsize=16)
+@timed("regulation impacts")
+def _impact_table(dimension, path, mtime):
+    build = IMPACT_SOURCES[dimension][1]
+    return read_typed(path, build, suffix=_impact_suffix(dimension))
+
+
+def build_impact_caches():
+    """Preprocessing step: (re)build the impact table of every dimension."""
+    for dimension, (path, build) in IMPACT_SOURCES.items():
+        target = cache_path_for(path, _impact_suffix(dimension))
+        _write_parquet(build(path), target)
+        print(f"{dimension} impacts -> {os.path.relpath(target, DATA_DIR)}")
+
+
+def impact_table(dimension, path=None):
+    """Precomputed impacts of every event for ``dimension`` ("class", "manufacturer" or "state").
+
+    Shared between sessions, so treat the returned frame as read-only.
+    """
+    if dimension not in IMPACT_SOURCES:
+        raise ValueError(f"unknown dimension: {dimension}")
+    return _impact_table(dimension, *file_version(path or IMPACT_SOURCES[dimension][0])).copy(deep=False)
+
+
+def _format(value):
+    return f"{value:,.0f}" if abs(value) >= 1000 else f"{value:,.3g}"
+
+
+def _describe(row):
+    text = f"{_format(row['Mean Before'])} → {_format(row['Mean After'])}"
+    if pd.notna(row["Change %"]):
+        text += f" ({row['Change %']:+.1f}%)"
+    if pd.notna(row["Slope Change"]):
+        text += f", trend {_format(row['Slope Before'])} → {_format(row['Slope After'])}/yr"
+    return text
+
+
+def _window_text(year, years_before, years_after):
+    return f"mean of {years_before} years before {year} vs {years_after} from {year}"
+
+
+def impact_annotations(dimension, path, mtime, years, items):
+    """{event year: {"window": ..., "lines": {label: text}}} for marker hover text.
+
+    ``items`` are (label, entity, metric) triples, e.g. one per selected
+    class for the charted metric. Takes the figure builder's ``(path, mtime)``
+    so the text matches the data version the figure was built from. Items
+    without figures for an event are left out, and at most MAX_ANNOTATED are
+    listed. The window names the years actually averaged; when they differ
+    between items, each line gives its own.
+    """
+    table = _impact_table(dimension, path, mtime)
+    rows = table[table["Event Year"].isin(list(years))].set_index(["Event Year", "Entity", "Metric"])
+    notes = {}
+    for year in years:
+        lines = {}
+        for label, entity, metric in items:
+            key = (year, str(entity), metric)
+            if key in rows.index:
+                row = rows.loc[key]
+                lines[label] = (_describe(row), (int(row["Years Before"]), int(row["Years After"])))
+        if not lines:
+            continue
+        counts = {count for _, count in lines.values()}
+        if len(counts) == 1:
+            window = _window_text(year, *counts.pop())
+            lines = {label: text for label, (text, _) in lines.items()}
+        else:
+            window = _window_text(year, f"up to {IMPACT_WINDOW}", f"up to {IMPACT_WINDOW}")
+            lines = {label: f"{text} [{before} vs {after} years]" for label, (text, (before, after)) in lines.items()}
+        if len(lines) > MAX_ANNOTATED:
+            extra = len(lines) - MAX_ANNOTATED
+            lines = dict(list(lines.items())[:MAX_ANNOTATED])
+            lines["…"] = f"and {extra} more"
+        notes[year] = {"window": window, "lines": lines}
+    return notes
+
+
+def hover_text(note, heading):
+    """Plotly hover text of one impact_annotations entry."""
+    return "<br>".join([f"{heading}, {note['window']}"] + [f"{label}: {text}" for label, text in note["lines"].items()])
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from core.llm import ChatBackend
+from core.paths import CACHE_DIR
+
+CACHE_PATH = os.path.join(CACHE_DIR, "chat_responses.sqlite3")
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+# Shorter questions ("why?", "and trucks?") depend on the conversation, so they are never cached
+MIN_QUESTION_WORDS = 4
+
+
+def normalize_question(text):
+    """Lower case, punctuation stripped, whitespace collapsed."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class ResponseCache:
+    """On-disk (SQLite) cache of answers with a TTL and a size limit.
+
+    Least recently used entries are evicted beyond ``max_entries``. Hit and
+    miss counters are kept per process.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl_s=DEFAULT_TTL_S, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, answer TEXT, created REAL, last_used REAL)")
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across Streamlit's script threads
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT answer, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl_s:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def put(self, key, answer):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, answer, now, now))
+            db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_s,))
+            db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with self._connect() as db:
+            size = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+
+def cache_key(messages, model=""):
+    """Key for the last user question and its context, or None if it should not be cached.
+
+    The context is the model and every message sent before the question:
+    the system messages (including the summary of earlier turns) and the
+    recent turns. A follow-up is therefore only answered from the cache
+    within the same conversation, never from another one.
+    """
+    last = max((i for i, m in enumerate(messages) if m["role"] == "user"), default=None)
+    if last is None:
+        return None
+    question = normalize_question(messages[last]["content"])
+    if len(question.split()) < MIN_QUESTION_WORDS:
+        return None
+    context = [f"{m['role']}\x1e{m['content']}" for m in messages[:last]]
+    return hashlib.sha256("\x1f".join([model, *context, question]).encode()).hexdigest()
+
+
+class CachedStream:
+    """Chunk iterator returned by CachedBackend.stream; ``cache_hit`` tells where it came from."""
+
+    def __init__(self, chunks, cache_hit):
+        self._chunks = chunks
+        self.cache_hit = cache_hit
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    def close(self):
+        if hasattr(self._chunks, "close"):
+            self._chunks.close()
+
+
+class CachedBackend(ChatBackend):
+    """Answers repeated questions from a ResponseCache, otherwise streams from ``backend``.
+
+    Only answers that streamed to completion are stored.
+    """
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.name = f"cached-{backend.name}"
+
+    def stream(self, messages):
+        key = cache_key(messages, getattr(self.backend, "model", self.backend.name))
+        answer = self.cache.get(key) if key else None
+        if answer is not None:
+            return CachedStream(iter([answer]), cache_hit=True)
+        return CachedStream(self._stream_and_store(key, messages), cache_hit=False)
+
+    def _stream_and_store(self, key, messages):
+        parts = []
+        chunks = self.backend.stream(messages)
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            chunks.close()
+        if key and parts:
+            self.cache.put(key, "".join(parts))
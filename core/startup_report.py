@@ -0,0 +1,99 @@
+"""Import cost of each page, measured in a fresh interpreter per page.
+
+    python -m core.startup_report
+
+"eager" is what the page script imports at the top level; "deferred" is
+what the page imports in nested blocks and what the core modules it uses,
+directly or through other core modules, import inside functions, i.e. on
+the first chart or request that needs it. That is an upper bound: a page
+does not necessarily call every function that defers an import. streamlit
+itself is excluded because the server has loaded it before any page runs.
+"""
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Home.py"] + sorted(os.path.join("pages", name) for name in os.listdir(os.path.join(ROOT, "pages")) if name.endswith(".py"))
+
+
+def _parse(path):
+    with open(os.path.join(ROOT, path)) as f:
+        return ast.parse(f.read())
+
+
+def _imported_names(nodes):
+    modules = []
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return modules
+
+
+def page_imports(path):
+    """(eager, deferred) module names for a page script."""
+    tree = _parse(path)
+    eager = _imported_names(tree.body)
+    # Imports nested in the page itself (e.g. under ``if user_input:``)
+    deferred = [m for m in _imported_names(ast.walk(tree)) if m not in eager]
+    # Follow every core module reachable from the page, since each may defer imports of its own
+    queue = [m for m in eager + deferred if m.startswith("core.")]
+    seen = set()
+    while queue:
+        module = queue.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        tree = _parse(module.replace(".", os.sep) + ".py")
+        functions = [node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        deferred += [m for f in functions for m in _imported_names(ast.walk(f)) if m not in eager]
+        queue += [m for m in _imported_names(ast.walk(tree)) if m.startswith("core.")]
+    return eager, sorted(set(deferred))
+
+
+def import_times(modules):
+    """Cumulative import time in ms of every top-level module pulled in by ``modules``, and the ones not installed.
+
+    Each module is imported on its own, so a missing optional dependency
+    (e.g. tiktoken) is reported instead of failing the whole measurement.
+    """
+    code = "\n".join(f"try:\n    import {m}\nexcept ImportError:\n    print({m!r})" for m in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Indented names are nested imports already counted in their parent
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            times[name.strip()] = int(cumulative) / 1000
+    return times, result.stdout.split()
+
+
+def _cost(modules, already_loaded):
+    times, missing = import_times(modules)
+    times = {name: ms for name, ms in times.items() if name not in already_loaded}
+    return times, sum(times.values()), missing
+
+
+def main():
+    server = set(import_times(["streamlit"])[0])
+    print(f"{'page':<26}{'eager ms':>10}{'deferred ms':>13}  heaviest imports")
+    for page in PAGES:
+        eager, deferred = page_imports(page)
+        eager_times, eager_ms, _ = _cost(["streamlit"] + eager, server)
+        deferred_times, deferred_ms, missing = _cost(["streamlit"] + eager + deferred, server | set(eager_times))
+        heaviest = sorted({**eager_times, **deferred_times}.items(), key=lambda item: -item[1])[:4]
+        line = f"{page:<26}{eager_ms:>10.1f}{deferred_ms:>13.1f}  " + ", ".join(f"{name} {ms:.0f}" for name, ms in heaviest)
+        if missing:
+            line += f" (not installed: {', '.join(missing)})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
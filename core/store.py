@@ -0,0 +1,215 @@
+"""Read-only data store shared by every server process on a node.
+
+    python -m core.store publish
+    python -m core.store status
+
+``publish`` writes each typed frame the loaders use into a new version
+directory, ``data/cache/store/<version>/``. Every column is one ``.npy``
+file; categoricals are stored as codes, with their categories kept in the
+manifest. Once the version is complete, the ``CURRENT`` pointer is
+replaced in one atomic rename.
+
+With ``EMISSION_TRACKER_STORE=1`` the loaders in core.data map the columns
+of the current version with ``numpy.load(mmap_mode="r")`` instead of
+reading and cleaning their own copy. Every worker then shares the same
+page-cache pages. The published version stands in for the file's
+modification time in ``file_version``, so every cache keyed on it moves to a
+new publish at once.
+
+A publish keeps the version it replaces. Workers still mapping that version
+can keep reading it. Older versions are deleted.
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from core.data import (
+    CACHE_DIR, DATA_DIR, MANUFACTURER_DATA_PATH, REGISTRATION_DATA_PATH, VEHICLE_DATA_PATH, parse_registration_csv,
+    parse_vehicle_csv,
+)
+
+STORE_DIR = os.environ.get("EMISSION_TRACKER_STORE_DIR") or os.path.join(CACHE_DIR, "store")
+POINTER = "CURRENT"
+MANIFEST = "manifest.json"
+# Versions kept on disk: the current one and the one it replaced
+KEEP_VERSIONS = 2
+
+_pointer_lock = threading.Lock()
+_pointer = (None, None)
+
+
+def dataset_name(path, suffix=""):
+    """Store name of a frame derived from ``path``, as in cache_path_for."""
+    return os.path.splitext(os.path.basename(path))[0] + suffix
+
+
+def _sources():
+    from core.manufacturers import build_manufacturer_year_table
+
+    return [
+        (VEHICLE_DATA_PATH, "", parse_vehicle_csv),
+        # Only the year table: nothing reads the raw manufacturer rows
+        (MANUFACTURER_DATA_PATH, ".by_year", build_manufacturer_year_table),
+        (REGISTRATION_DATA_PATH, "", parse_registration_csv),
+    ]
+
+
+def _write_frame(df, directory):
+    os.makedirs(directory)
+    columns = []
+    for i, (name, column) in enumerate(df.items()):
+        entry = {"name": name, "file": f"{i}.npy"}
+        if not isinstance(column.dtype, pd.CategoricalDtype) and not pd.api.types.is_numeric_dtype(column):
+            column = column.astype("category")
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            entry["categories"] = column.cat.categories.tolist()
+            values = column.cat.codes.to_numpy()
+        else:
+            values = column.to_numpy()
+        entry["dtype"] = values.dtype.str
+        np.save(os.path.join(directory, entry["file"]), values)
+        columns.append(entry)
+    return {"rows": len(df), "columns": columns}
+
+
+def publish(store_dir=STORE_DIR):
+    """Build every dataset into a new version and make it current; returns the version."""
+    now = time.time()
+    version = time.strftime("%Y%m%dT%H%M%S", time.localtime(now)) + f".{int(now % 1 * 1e6):06d}-{os.getpid()}"
+    staging = os.path.join(store_dir, f".staging-{version}")
+    manifest = {"version": version, "created": now, "datasets": {}}
+    try:
+        for path, suffix, build in _sources():
+            name = dataset_name(path, suffix)
+            entry = _write_frame(build(path), os.path.join(staging, name))
+            entry["source"] = {"file": os.path.basename(path), "mtime": os.path.getmtime(path), "size": os.path.getsize(path)}
+            manifest["datasets"][name] = entry
+        with open(os.path.join(staging, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.rename(staging, os.path.join(store_dir, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    tmp = os.path.join(store_dir, f"{POINTER}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(store_dir, POINTER))
+    _prune(store_dir, version)
+    return version
+
+
+def _versions(store_dir):
+    return sorted(
+        name for name in os.listdir(store_dir)
+        if os.path.isdir(os.path.join(store_dir, name)) and not name.startswith(".")
+    )
+
+
+def _prune(store_dir, current):
+    versions = _versions(store_dir)
+    keep = set(versions[-KEEP_VERSIONS:]) | {current}
+    for name in versions:
+        if name not in keep:
+            # Workers that still map these files keep them alive until they unmap
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+
+def current_version(store_dir=STORE_DIR):
+    """Version the pointer names, or None before the first publish."""
+    global _pointer
+    pointer = os.path.join(store_dir, POINTER)
+    try:
+        stat = os.stat(pointer)
+    except FileNotFoundError:
+        return None
+    key = (pointer, stat.st_ino, stat.st_mtime_ns)
+    with _pointer_lock:
+        if _pointer[0] == key:
+            return _pointer[1]
+    with open(pointer) as f:
+        version = f.read().strip()
+    with _pointer_lock:
+        _pointer = (key, version)
+    return version
+
+
+@lru_cache(maxsize=8)
+def _manifest(store_dir, version):
+    with open(os.path.join(store_dir, version, MANIFEST)) as f:
+        return json.load(f)
+
+
+def published_version(path, suffix=None, store_dir=STORE_DIR):
+    """Current version if it holds a frame derived from ``path``, else None.
+
+    With ``suffix``, only that frame counts. Without it, any frame built
+    from the file does (e.g. only its ``.by_year`` table is published), so
+    every cache keyed on the file moves with a publish.
+    """
+    version = current_version(store_dir)
+    if version is None:
+        return None
+    datasets = _manifest(store_dir, version)["datasets"]
+    if suffix is None:
+        found = any(entry["source"]["file"] == os.path.basename(path) for entry in datasets.values())
+    else:
+        found = dataset_name(path, suffix) in datasets
+    return version if found else None
+
+
+def read_published(path, suffix="", store_dir=STORE_DIR):
+    """The current version's frame for ``path``, memory-mapped, or None if it has none.
+
+    Columns are read-only views of the mapped files; under copy-on-write a
+    write to a derived frame copies the touched column first.
+    """
+    version = published_version(path, suffix, store_dir)
+    if version is None:
+        return None
+    entry = _manifest(store_dir, version)["datasets"][dataset_name(path, suffix)]
+    directory = os.path.join(store_dir, version, dataset_name(path, suffix))
+    columns = {}
+    for column in entry["columns"]:
+        values = np.load(os.path.join(directory, column["file"]), mmap_mode="r")
+        if "categories" in column:
+            values = pd.Categorical.from_codes(values, categories=column["categories"], validate=False)
+        columns[column["name"]] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def status(store_dir=STORE_DIR):
+    current = current_version(store_dir)
+    if current is None:
+        print(f"no published version in {store_dir}")
+        return
+    for version in _versions(store_dir):
+        marker = "*" if version == current else " "
+        print(f"{marker} {version}")
+        for name, entry in _manifest(store_dir, version)["datasets"].items():
+            directory = os.path.join(store_dir, version, name)
+            size = sum(os.path.getsize(os.path.join(directory, c["file"])) for c in entry["columns"])
+            source = os.path.join(DATA_DIR, entry["source"]["file"])
+            stale = os.path.exists(source) and os.path.getmtime(source) != entry["source"]["mtime"]
+            print(f"    {name:<48}{entry['rows']:>10,} rows{size / 2**20:>9.1f} MB" + ("  (source changed since)" if stale else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish or inspect the shared data store.")
+    parser.add_argument("command", choices=["publish", "status"])
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args(argv)
+    if args.command == "publish":
+        os.makedirs(args.store_dir, exist_ok=True)
+        print(f"published {publish(args.store_dir)} to {args.store_dir}")
+    status(args.store_dir)
+
+
+if __name__ == "__main__":
+    main()
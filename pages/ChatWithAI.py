@@ -1,29 +1,43 @@
 import streamlit as st
-import base64
-import os
-import openai
+
+from core.branding import show_globe_logo
+from core.context import DEFAULT_TOKEN_BUDGET, build_prompt
+from core.llm import SYSTEM_PROMPT, BackendUnavailable, TimedStream, get_backend, get_setting
+from core.perf import begin_run, end_run, stage
+from core.response_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL_S
 
 # Set the page configuration
 st.set_page_config(page_title="Talk to Us", page_icon="🗣️")
 
-globe_logo_path = "data/logoGLOBE.png"
-if os.path.exists(globe_logo_path):
-    st.markdown(
-        f"""
-        <div style="position: absolute; top: 30px; right: 30px;">
-            <img src="data:image/png;base64,{base64.b64encode(open(globe_logo_path, "rb").read()).decode()}" alt="globe" width="80">
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+# Per-stage timings of this rerun (EMISSION_TRACKER_PERF=log or panel)
+begin_run("ChatWithAI")
 
-# Load OpenAI API Key
-openai.api_key = st.secrets["OPENAI_API_KEY"]
+show_globe_logo()
 
 # Page title
 st.title("Talk to Our Emissions AI 🤖")
 st.write("Ask me anything about vehicle emissions, environmental impact, or regulations!")
 
+# Chat backend: OpenAI by default, CHAT_BACKEND = "fake" for a local stand-in
+# (openai is only imported once a key is configured)
+backend_choice = get_setting(st.secrets, "CHAT_BACKEND", "openai")
+api_key = get_setting(st.secrets, "OPENAI_API_KEY")
+
+if backend_choice != "fake" and not api_key:
+    st.info("The AI chat is not configured. Add OPENAI_API_KEY to .streamlit/secrets.toml to enable it.")
+    st.stop()
+
+# One shared client caps concurrent requests (CHAT_MAX_CONCURRENCY) and retries rate limits;
+# repeated questions are answered from an on-disk cache (CHAT_CACHE_TTL_S = 0 turns it off)
+backend = get_backend(
+    backend_choice, api_key,
+    base_url=get_setting(st.secrets, "OPENAI_BASE_URL"),
+    max_concurrency=int(get_setting(st.secrets, "CHAT_MAX_CONCURRENCY", 8)),
+    cache_ttl_s=int(get_setting(st.secrets, "CHAT_CACHE_TTL_S", DEFAULT_TTL_S)),
+    cache_max_entries=int(get_setting(st.secrets, "CHAT_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+)
+token_budget = int(get_setting(st.secrets, "CHAT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -37,28 +51,46 @@ for message in st.session_state.messages:
 user_input = st.chat_input("Ask your emissions question here...")
 
 if user_input:
-    # Save user message
+    # Save and show user message
     st.session_state.messages.append({"role": "user", "content": user_input})
+    with st.chat_message("user"):
+        st.markdown(user_input)
+
+    # Ground the answer in the few dataset facts that match the question
+    # (core.facts pulls in pandas, so it is only imported once a question is asked)
+    from core.facts import facts_prompt, relevant_facts
 
-    # Generate AI response
-    with st.spinner("Thinking..."):
+    with stage("facts lookup"):
+        facts = relevant_facts(user_input)
+    system_prompt = f"{SYSTEM_PROMPT}\n\n{facts_prompt(facts)}" if facts else SYSTEM_PROMPT
+
+    # Keep the prompt within the token budget: recent turns verbatim, older ones summarized
+    with stage("prompt build"):
+        prompt, usage = build_prompt(system_prompt, st.session_state.messages, token_budget)
+
+    # Stream the AI response into the chat bubble as it arrives
+    with st.chat_message("assistant"):
+        chunks = backend.stream(prompt)
+        stream = TimedStream(chunks)
         try:
-            response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an environmental science expert. Only answer questions about vehicle emissions, fuel efficiency, pollution, or related environmental impacts."},
-                    *st.session_state.messages,
-                ],
-            )
-            ai_message = response.choices[0].message.content
-
-            # Save assistant response
-            st.session_state.messages.append({"role": "assistant", "content": ai_message})
-
-            # Display assistant response
-            with st.chat_message("assistant"):
-                st.markdown(ai_message)
-
-        except openai.RateLimitError:
-            with st.chat_message("assistant"):
-                st.error("⚠️ Sorry, the AI service is currently unavailable. Please try again later.")
\ No newline at end of file
+            st.write_stream(stream)
+        except BackendUnavailable:
+            st.error("⚠️ Sorry, the AI service is currently unavailable. Please try again later.")
+        finally:
+            # A new message reruns the page mid-stream: cancel the request and keep what arrived
+            stream.close()
+            if stream.text:
+                st.session_state.messages.append({"role": "assistant", "content": stream.text})
+
+        if stream.finished:
+            condensed = f", {len(facts)} dataset facts" if facts else ""
+            condensed += f", {usage['summarized']} earlier messages summarized" if usage["summarized"] else ""
+            condensed += f", {usage['dropped']} dropped" if usage["dropped"] else ""
+            if getattr(chunks, "cache_hit", False):
+                cache = backend.cache.stats()
+                st.caption(f"Answered from cache in {stream.total_s * 1000:.0f} ms · {cache['hits']} hits, {cache['misses']} misses")
+            else:
+                st.caption(f"First token after {stream.first_token_s:.2f}s, complete after {stream.total_s:.2f}s · "
+                           f"{usage['tokens']} prompt tokens{condensed}")
+
+end_run()
@@ -1,62 +1,35 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import altair as alt
-import numpy as np
-import base64
 import os
 
+from core.branding import show_globe_logo
+from core.data import MANUFACTURER_DATA_PATH
+from core.manufacturers import load_manufacturer_year_table, manufacturer_figure
+from core.perf import begin_run, end_run, stage
+from core.regulations import regulation_events
+
 st.set_page_config(
     page_title="Emission Tracker",
     page_icon="🌎",
     layout="wide"
 )
 
-globe_logo_path = "data/logoGLOBE.png"
-if os.path.exists(globe_logo_path):
-    st.markdown(
-        f"""
-        <div style="position: absolute; top: 30px; right: 30px;">
-            <img src="data:image/png;base64,{base64.b64encode(open(globe_logo_path, "rb").read()).decode()}" alt="globe" width="80">
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+# Per-stage timings of this rerun (EMISSION_TRACKER_PERF=log or panel)
+begin_run("Manufacturer")
 
+show_globe_logo()
 
 
-# Get the absolute path to the data file
-co2_data_path = os.path.join(os.path.dirname(__file__), "../data/Manufacturer_Response.csv")
 
 # Check if file exists before reading
-if not os.path.exists(co2_data_path):
+if not os.path.exists(MANUFACTURER_DATA_PATH):
     st.error("Error: CO2 emissions data file was not found. Please check the file path.")
     st.stop()
 
 
 st.title("Manufacturer CO2 Emissions Data")
 
-#converts data to ints and grups by manufactuer
-dfmanufacturer = pd.read_csv(co2_data_path)
-dfmanufacturer["Model Year"] = pd.to_numeric(dfmanufacturer["Model Year"], errors='coerce').astype('Int64')
-dfmanufacturer["Real-World MPG"] =pd.to_numeric(dfmanufacturer["Real-World MPG"], errors='coerce').astype('Float64')
-dfmanufacturer["Real-World MPG_City"] = pd.to_numeric(dfmanufacturer["Real-World MPG_City"], errors='coerce').astype('Float64')
-dfmanufacturer["Real-World MPG_Hwy"] = pd.to_numeric(dfmanufacturer["Real-World MPG_Hwy"], errors='coerce').astype('Float64')
-dfmanufacturer["Real-World CO2 (g/mi)"] = pd.to_numeric(dfmanufacturer["Real-World CO2 (g/mi)"], errors='coerce').astype('Float64')
-dfmanufacturer["Real-World CO2_City (g/mi)"] =pd.to_numeric(dfmanufacturer["Real-World CO2_City (g/mi)"], errors='coerce').astype('Float64')
-dfmanufacturer["Real-World CO2_Hwy (g/mi)"] = pd.to_numeric(dfmanufacturer["Real-World CO2_Hwy (g/mi)"], errors='coerce').astype('Float64')
-dfmanufacturer["Weight (lbs)"] = pd.to_numeric(dfmanufacturer["Weight (lbs)"], errors='coerce').astype('Float64')
-dfmanufacturer["Horsepower (HP)"] = pd.to_numeric(dfmanufacturer["Horsepower (HP)"], errors='coerce').astype('Float64')
-
-
-
-dfmanufacturer = dfmanufacturer.groupby(["Manufacturer", "Model Year"]).mean(numeric_only=True).reset_index()
-print(dfmanufacturer.head(200))
-
-df_co2 = pd.read_csv(co2_data_path)
-df_co2.rename(columns={"Model Year": "Year", "Real-World CO2 (g/mi)": "CO2 Emissions", "Real-World CO2_City (g/mi)": "CO2 Emissions City", "Real-World CO2_Hwy (g/mi)": "CO2 Emissions Hwy"}, inplace=True)
-df_co2["Year"] = pd.to_numeric(df_co2["Year"], errors='coerce').astype('Int64')
-df_co2 = df_co2.dropna(subset=["Year", "CO2 Emissions"])
+# Manufacturer x model year means, aggregated once and persisted in data/cache
+dfmanufacturer = load_manufacturer_year_table()
 
 
 st.subheader("Trends Over Time by Manufacturer")
@@ -81,33 +54,24 @@ selected_y_col = y_axis_options[selected_y_label]
 manufacturers = dfmanufacturer["Manufacturer"].dropna().unique()
 selected_manufacturers = st.multiselect("Select Manufacturer(s):", sorted(manufacturers), default=manufacturers[:3])
 
+# Regulation events within the data, for the start-year filter and the chart markers
+events = regulation_events(after=int(dfmanufacturer["Model Year"].min()), until=int(dfmanufacturer["Model Year"].max()))
+
 # Regulation year filter (with "All Years" option)
 start_year_option = st.selectbox(
     "Start data from regulation year:",
-    ["All Years", 1994, 2000, 2012, 2017],
+    ["All Years"] + [event["year"] for event in events],
     index=0
 )
+show_regulations = st.checkbox("Show regulation events", value=True)
 
-# Filter data
-if start_year_option == "All Years":
-    filtered_df = dfmanufacturer[dfmanufacturer["Manufacturer"].isin(selected_manufacturers)]
-else:
-    filtered_df = dfmanufacturer[
-        (dfmanufacturer["Manufacturer"].isin(selected_manufacturers)) &
-        (dfmanufacturer["Model Year"] >= int(start_year_option))
-    ]
-
-
-
-# Create line chart
-fig = px.line(
-    filtered_df,
-    x="Model Year",
-    y=selected_y_col,
-    color="Manufacturer",
-    title=f"{selected_y_label} Over Time",
-    labels={selected_y_col: selected_y_label, "Model Year": "Model Year"}
+# Filter data and build the chart (shared figure cache)
+fig = manufacturer_figure(
+    selected_manufacturers, selected_y_col, selected_y_label,
+    start_year=None if start_year_option == "All Years" else int(start_year_option),
+    regulation_lines=[(event["year"], event["label"]) for event in events] if show_regulations else (),
 )
+with stage("serialize plotly"):
+    st.plotly_chart(fig)
 
-fig.update_layout(height=500, margin=dict(l=40, r=40, t=40, b=40))
-st.plotly_chart(fig)
+end_run()
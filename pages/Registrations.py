@@ -1,53 +1,33 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import base64
 import os
 
+from core.branding import show_globe_logo
+from core.data import REGISTRATION_DATA_PATH, load_registration_data
+from core.lod import LOD_OPTIONS
+from core.perf import begin_run, end_run, stage
+from core.regulations import regulation_events
+from core.registrations import (
+    COMPARISON_VIEWS, STATE_GROUPS, overlapping_states, registration_map_figure, registration_trend_figure,
+)
+
 st.set_page_config(
     page_title="Emission Tracker",
     page_icon="🌎",
     layout="wide"
 )
 
-globe_logo_path = "data/logoGLOBE.png"
-if os.path.exists(globe_logo_path):
-    st.markdown(
-        f"""
-        <div style="position: absolute; top: 30px; right: 30px;">
-            <img src="data:image/png;base64,{base64.b64encode(open(globe_logo_path, "rb").read()).decode()}" alt="globe" width="80">
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+# Per-stage timings of this rerun (EMISSION_TRACKER_PERF=log or panel)
+begin_run("Registrations")
 
-# Get the absolute path to the data file
-data_path = os.path.join(os.path.dirname(__file__), "../data/Motor_Vehicle_Registrations_Dashboard_data.csv")
+show_globe_logo()
 
 # Check if file exists before reading
-if not os.path.exists(data_path):
+if not os.path.exists(REGISTRATION_DATA_PATH):
     st.error("Error: Vehicle registration data file was not found. Please check the file path.")
     st.stop()
 
-# Load vehicle registration data
-df = pd.read_csv(data_path)
-df.rename(columns={"year": "Year"}, inplace=True)
-df["Year"] = pd.to_numeric(df["Year"], errors='coerce')
-df = df.dropna(subset=["Year"])
-df["Year"] = df["Year"].astype(int)
-
-# Mapping full state names to abbreviations
-state_abbreviations = {
-    "Alabama": "AL", "Alaska": "AK", "Arizona": "AZ", "Arkansas": "AR", "California": "CA", "Colorado": "CO", "Connecticut": "CT",
-    "Delaware": "DE", "Florida": "FL", "Georgia": "GA", "Hawaii": "HI", "Idaho": "ID", "Illinois": "IL", "Indiana": "IN", "Iowa": "IA",
-    "Kansas": "KS", "Kentucky": "KY", "Louisiana": "LA", "Maine": "ME", "Maryland": "MD", "Massachusetts": "MA", "Michigan": "MI", "Minnesota": "MN",
-    "Mississippi": "MS", "Missouri": "MO", "Montana": "MT", "Nebraska": "NE", "Nevada": "NV", "New Hampshire": "NH", "New Jersey": "NJ",
-    "New Mexico": "NM", "New York": "NY", "North Carolina": "NC", "North Dakota": "ND", "Ohio": "OH", "Oklahoma": "OK", "Oregon": "OR",
-    "Pennsylvania": "PA", "Rhode Island": "RI", "South Carolina": "SC", "South Dakota": "SD", "Tennessee": "TN", "Texas": "TX", "Utah": "UT",
-    "Vermont": "VT", "Virginia": "VA", "Washington": "WA", "West Virginia": "WV", "Wisconsin": "WI", "Wyoming": "WY"
-}
-
-df["state"] = df["state"].map(state_abbreviations)
+# Load vehicle registration data (cached per process, states mapped to abbreviations in core.data)
+df = load_registration_data()
 
 #title
 st.title("Motor Vehicle Registrations Dashboard")
@@ -64,9 +44,8 @@ include_bus = st.sidebar.checkbox("Bus", value=True)
 include_truck = st.sidebar.checkbox("Truck", value=True)
 include_motorcycle = st.sidebar.checkbox("Motorcycle", value=True)
 
-map_df = df[df["Year"] == selected_map_year]
-if exclude_california:
-    map_df = map_df[map_df["state"] != "CA"]
+# Optional level of detail for long year ranges in the trend chart
+lod_label = st.sidebar.selectbox("Level of detail:", list(LOD_OPTIONS))
 
 #sum only the selected vehicle types
 selected_columns = []
@@ -79,21 +58,12 @@ if include_truck:
 if include_motorcycle:
     selected_columns.append("Motorcycle")
 
-if selected_columns:
-    map_df["Total Vehicles"] = map_df[selected_columns].sum(axis=1)
-else:
-    map_df["Total Vehicles"] = 0  #default to zero
-
-map_df = map_df.dropna(subset=["state", "Total Vehicles"])
-
-if not map_df.empty:
-    fig_map = px.choropleth(
-        map_df, locations="state", locationmode="USA-states", color="Total Vehicles",
-        hover_name="state", title=f"Total Vehicle Registrations in {selected_map_year}",
-        color_continuous_scale="blues", scope="usa"
-    )
-    fig_map.update_layout(height=500, margin=dict(l=40, r=40, t=40, b=40))
-    st.plotly_chart(fig_map)
+# Map built from a slice of the precomputed year x state x vehicle type cube (shared figure cache)
+fig_map = registration_map_figure(selected_map_year, selected_columns, exclude_states=["CA"] if exclude_california else [])
+
+if fig_map is not None:
+    with stage("serialize plotly"):
+        st.plotly_chart(fig_map)
 else:
     st.warning("No data available for the selected year.")
 
@@ -101,9 +71,23 @@ else:
 col1, col2 = st.columns([1, 3])
 
 with col1:
-    #selecting state
+    # States and regions to compare (a region totals its states)
     states = df["state"].dropna().unique()
-    selected_state = st.selectbox("Select a State:", states)
+    selected_states = st.multiselect("Select States or Regions:", list(STATE_GROUPS) + list(states), default=list(states[:1]))
+
+    # How to show them: totals, growth, share of the selection or an index
+    # (a share needs at least two series, one alone is always 100%)
+    view_labels = [label for label, view in COMPARISON_VIEWS.items() if view != "share" or len(selected_states) > 1]
+    view_label = st.selectbox("Show:", view_labels)
+    if len(view_labels) < len(COMPARISON_VIEWS):
+        st.caption("Select two or more states or regions to compare their shares.")
+    overlap = overlapping_states(selected_states)
+    if COMPARISON_VIEWS[view_label] == "share" and overlap:
+        st.warning(
+            f"{', '.join(overlap)} {'is' if len(overlap) == 1 else 'are'} counted in more than one selected series, "
+            "so the shares add up to more than 100%."
+        )
+    rolling_window = st.select_slider("Rolling average (years):", options=[1, 3, 5, 10], value=1)
 
     # Allow user to select a date range
     min_year = int(df["Year"].min())
@@ -111,35 +95,25 @@ with col1:
     start_year, end_year = st.slider("Select Year Range:", min_value=min_year, max_value=max_year, value=(min_year, max_year))
 
 
-    # Checkbox controls for vertical lines
-    show_1975 = st.checkbox("Show 1975: CAFE Standards", value=True)
-    show_1994 = st.checkbox("Show 1994: Tier 1 Emissions", value=True)
-    show_2004 = st.checkbox("Show 2004: Tier 2 Emissions", value=True)
-    show_2012 = st.checkbox("Show 2012: GHG Emissions", value=True)
-    show_2017 = st.checkbox("Show 2017: Tier 3 Emissions", value=True)
-
-# Filter registration data based on state and selected year range
-filtered_df = df[(df["state"] == selected_state) & (df["Year"] >= start_year) & (df["Year"] <= end_year)]
-
-# Melt dataframe for plotting different vehicle types
-melted_df = filtered_df.melt(id_vars=["Year"], value_vars=["Auto", "Bus", "Truck", "Motorcycle"], var_name="Vehicle Type", value_name="Registrations")
-
+    # Checkbox controls for vertical lines, one per regulation event within the data
+    regulation_lines = []
+    for event in regulation_events(after=min_year, until=max_year):
+        if st.checkbox(f"Show {event['year']}: {event['name']}", value=True):
+            regulation_lines.append((event["year"], event["label"]))
 
 with col2:
-    fig_reg = px.line(melted_df, x="Year", y="Registrations", color="Vehicle Type", title=f"Vehicle Registrations in {selected_state}", labels={"Registrations": "Number of Registrations"})
-    # Add lines based on checkboxes
-    if show_1975:
-        fig_reg.add_vline(x=1975, line_dash="dash", line_color="black", annotation_text="CAFE Standards", annotation_position="top right")
-    if show_1994:
-        fig_reg.add_vline(x=1994, line_dash="dash", line_color="black", annotation_text="Tier 1", annotation_position="top right")
-    if show_2004:
-        fig_reg.add_vline(x=2004, line_dash="dash", line_color="black", annotation_text="Tier 2", annotation_position="top right")
-    if show_2012:
-        fig_reg.add_vline(x=2012, line_dash="dash", line_color="black", annotation_text="GHG", annotation_position="top right")
-    if show_2017:
-        fig_reg.add_vline(x=2017, line_dash="dash", line_color="black", annotation_text="Tier 3", annotation_position="top right")
-    fig_reg.update_layout(height=500, margin=dict(l=40, r=40, t=40, b=40))
-    st.plotly_chart(fig_reg)
+    if selected_states and selected_columns:
+        # One state or region is split by vehicle type, several are compared on the selected types
+        fig_reg = registration_trend_figure(
+            selected_states, start_year, end_year, regulation_lines, lod_method=LOD_OPTIONS[lod_label],
+            vehicle_types=selected_columns, view=COMPARISON_VIEWS[view_label], window=rolling_window,
+        )
+        with stage("serialize plotly"):
+            st.plotly_chart(fig_reg)
+    else:
+        st.info("Select at least one state or region and one vehicle type.")
 
 # Add link to Home.py and CO2 page in sidebar
-st.sidebar.page_link("Home.py", label="Home")
\ No newline at end of file
+st.sidebar.page_link("Home.py", label="Home")
+
+end_run()